@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -5,10 +8,10 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
-from . import crud, models, schemas
+from . import crud, models, schemas, user_cache, views
 
 from .database import get_db
 
@@ -19,6 +22,17 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt займає сотні мілісекунд CPU, тому виконується в окремому пулі, а не в event loop.
+# PASSWORD_HASH_EXECUTOR: "thread" (bcrypt відпускає GIL) або "process"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# Скільки запитів може чекати в черзі понад зайнятих воркерів; решта одразу отримує 503
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+_password_executor: Optional[Executor] = None
+_password_jobs_in_flight = 0
+_password_jobs_lock = threading.Lock()
+
 # Для HTML форм, tokenUrl буде вказувати на наш API endpoint
 # Для API-only, це може бути просто "token"
 # Для HTML, ми будемо використовувати куки, але OAuth2PasswordBearer корисний для API-частини
@@ -33,6 +47,55 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                                    thread_name_prefix="password-hash")
+    return _password_executor
+
+
+def shutdown_password_executor():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+def _password_job_done(_future):
+    global _password_jobs_in_flight
+    with _password_jobs_lock:  # Викликається з потоку пулу
+        _password_jobs_in_flight -= 1
+
+
+async def _run_password_job(func, *args):
+    global _password_jobs_in_flight
+    if _password_jobs_in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+            headers={"Retry-After": "1"},
+        )
+    job = get_password_executor().submit(func, *args)
+    with _password_jobs_lock:
+        _password_jobs_in_flight += 1
+    # Лічильник зменшується, коли завершилась сама задача в пулі, а не коли її перестали чекати:
+    # клієнт, що від'єднався, скасовує await, але bcrypt, який уже виконується, працює до кінця
+    job.add_done_callback(_password_job_done)
+    return await asyncio.wrap_future(job)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await _run_password_job(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -44,31 +107,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)) -> Optional[models.User]:
-    token = request.cookies.get("access_token")
-    if not token:
+def get_token_subject(token: str) -> Optional[str]:
+    """Email (sub) з дійсного JWT або None; розкодовані токени кешуються, БД не використовується."""
+    email = user_cache.get_token_subject(token)
+    if email is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email = payload.get("sub")
+            if email is None:
+                return None
+            token_data = schemas.TokenData(email=email)
+        except JWTError:
+            return None
+        email = token_data.email
+        user_cache.set_token_subject(token, email, payload.get("exp"))
+    return email
+
+
+async def get_user_by_token(token: str, db: AsyncSession) -> Optional[user_cache.UserSnapshot]:
+    """Повертає знімок користувача за JWT або None. Спершу дивиться в кеш, і лише при промаху йде в БД."""
+    email = get_token_subject(token)
+    if email is None:
         return None
 
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
-        detail="Could not validate credentials",
-        headers={"Location": "/auth/login"},  # Redirect to login if token invalid
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None  # Or raise credentials_exception if strict
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        return None  # Or raise credentials_exception
-
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = user_cache.get_user(email)
     if user is None:
-        return None  # Or raise credentials_exception
+        try:
+            db_user = await crud.get_user_by_email(db, email=email)
+            if db_user is None:
+                return None
+            user = user_cache.set_user(db_user)
+        finally:
+            # Залежність виконується до обробника: повертаємо з'єднання в пул одразу, інакше сторінка
+            # тримала б два з'єднання (це й сесія обробника) аж до кінця рендеру. Знімок від сесії не залежить.
+            await views.release(db)
     return user
 
 
+async def get_current_user_from_cookie(request: Request, db: AsyncSession = Depends(get_db)) -> Optional[user_cache.UserSnapshot]:
+    token = request.cookies.get("access_token")
+    if not token:
+        return None
+    return await get_user_by_token(token, db)
+
+
 async def get_current_active_user(current_user: Optional[models.User] = Depends(get_current_user_from_cookie)):
     if not current_user:
         raise HTTPException(
@@ -90,7 +172,7 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
 
 
 # Функція для API (не для HTML форм, хоча може бути використана)
-async def get_current_user_api(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user_api(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     if not token:  # Якщо токен не надано (наприклад, для публічних сторінок)
         return None
 
@@ -99,20 +181,28 @@ async def get_current_user_api(token: str = Depends(oauth2_scheme), db: Session
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = await get_user_by_token(token, db)
     if user is None:
         raise credentials_exception
     return user
 
 
+async def get_token_subject_api(token: str = Depends(oauth2_scheme)) -> Optional[str]:
+    """Легка перевірка Bearer-токена без звернення до БД (для документації та службових ендпоінтів):
+    анонімний доступ дозволено, недійсний токен — 401."""
+    if not token:
+        return None
+    email = get_token_subject(token)
+    cached_user = user_cache.get_user(email) if email else None
+    if email is None or (cached_user is not None and not cached_user.is_active):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return email
+
+
 async def get_current_active_user_api(current_user: models.User = Depends(get_current_user_api)):
     if not current_user:  # Дозволяє анонімний доступ, якщо endpoint це дозволяє
         return None
@@ -0,0 +1,75 @@
+# Підготовка бази до роботи: міграції Alembic і адміністратор за замовчуванням.
+# На проді — один раз на розгортання, до старту воркерів: python -m app.bootstrap
+# і BOOTSTRAP_ON_STARTUP=false, щоб воркери стартували без жодної роботи з БД.
+# Для локальної розробки (за замовчуванням) той самий крок виконується в startup_event; повторний запуск
+# на актуальній схемі з наявним адміном коштує два швидкі SELECT, без Alembic і bcrypt.
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from . import crud, schemas, migrate
+from .database import get_engine, dispose_engines, SessionLocal
+
+BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "adminpassword")
+# Ключ pg_advisory_lock: кілька воркерів/подів, що стартують одночасно, не запускають міграції паралельно
+BOOTSTRAP_LOCK_ID = 7_240_118
+
+
+@asynccontextmanager
+async def _bootstrap_lock():
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+
+
+async def schema_is_current() -> bool:
+    async with get_engine().connect() as conn:
+        return await migrate.current_revisions(conn) == migrate.head_revisions()
+
+
+async def ensure_admin():
+    async with SessionLocal() as db:
+        if await crud.get_user_by_email(db, email=ADMIN_EMAIL):
+            print(f"Admin user {ADMIN_EMAIL} already exists.")
+            return
+        user_in = schemas.UserCreate(email=ADMIN_EMAIL, password=ADMIN_PASSWORD, full_name="Admin User",
+                                     role="admin")
+        try:
+            await crud.create_user(db=db, user=user_in)
+        except IntegrityError:
+            # Паралельний bootstrap уже створив адміна (унікальний email)
+            print(f"Admin user {ADMIN_EMAIL} already exists.")
+            return
+        print(f"Admin user {ADMIN_EMAIL} created with password {ADMIN_PASSWORD}")
+
+
+async def bootstrap():
+    """Ідемпотентна підготовка бази; безпечно викликати з кількох процесів одночасно."""
+    async with _bootstrap_lock():
+        if not await schema_is_current():
+            # Створення / оновлення таблиць через міграції Alembic
+            await asyncio.to_thread(migrate.upgrade_database, configure_logger=False)
+        await ensure_admin()
+
+
+async def _main():
+    try:
+        await bootstrap()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
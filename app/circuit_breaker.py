@@ -0,0 +1,43 @@
+# Простий circuit breaker: після кількох помилок поспіль "розмикається" і якийсь час не пропускає
+# виклики до залежності (MongoDB), щоб не чекати таймаутів на кожному запиті.
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_count = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        # Після reset_timeout пропускаємо одну пробну спробу
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self._state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        """Примусово розмикає ланцюг (наприклад, якщо ping при старті не пройшов)."""
+        if self._state != OPEN:
+            self.opened_count += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
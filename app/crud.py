@@ -1,23 +1,40 @@
-from sqlalchemy.orm import Session
-from . import models, schemas, auth
+import os
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 
+from sqlalchemy import select, update, insert, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from . import models, schemas, auth, user_cache, fragment_cache, rollups, progress_stream, idempotency
+from .database import dialect_insert
+from .pagination import keyset_page, bind_datetime, Page
+
+
+# Кількість шардів лічильника current_amount; 0 або 1 — звичайний атомарний UPDATE рядка проєкту
+DONATION_COUNTER_SHARDS = int(os.getenv("DONATION_COUNTER_SHARDS", 0))
 
 
 # User CRUD
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
 
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.User).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await auth.get_password_hash_async(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -25,83 +42,342 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate):
+    db_user = await get_user(db, user_id)
+    if not db_user:
+        return None
+    old_email = db_user.email
+    update_data = user_update.model_dump(exclude_unset=True)
+    password = update_data.pop("password", None)
+    if password:
+        db_user.hashed_password = await auth.get_password_hash_async(password)
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+    await db.commit()
+    await db.refresh(db_user)
+    # Роль / is_active могли змінитись — кешований знімок більше не актуальний
+    user_cache.invalidate_user(old_email)
+    user_cache.invalidate_user(db_user.email)
     return db_user
 
 
 # Project CRUD (повний CRUD для цієї сутності)
-def get_project(db: Session, project_id: int):
-    return db.query(models.Project).filter(models.Project.id == project_id).first()
+def _current_amount_column():
+    """current_amount разом із сумою шардів лічильника (у режимі шардів) як вираз SQL."""
+    if DONATION_COUNTER_SHARDS <= 1:
+        return models.Project.current_amount
+    shard_sum = select(func.coalesce(func.sum(models.ProjectCounterShard.amount), 0.0)) \
+        .where(models.ProjectCounterShard.project_id == models.Project.id).scalar_subquery()
+    return models.Project.current_amount + shard_sum
+
+
+async def _fold_counter_shards(db: AsyncSession, projects):
+    """Додає суми шардів лічильника до current_amount завантажених проєктів (лише в режимі шардів)."""
+    if DONATION_COUNTER_SHARDS <= 1 or not projects:
+        return projects
+    result = await db.execute(
+        select(models.Project.id, _current_amount_column())
+        .where(models.Project.id.in_([p.id for p in projects]))
+    )
+    totals = dict(result.all())
+    for project in projects:
+        # Без позначки "змінено": складена сума не повинна потрапити в UPDATE при наступному commit
+        set_committed_value(project, "current_amount", totals.get(project.id, project.current_amount))
+    return projects
+
+
+async def get_project(db: AsyncSession, project_id: int):
+    result = await db.execute(select(models.Project).filter(models.Project.id == project_id))
+    project = result.scalars().first()
+    if project:
+        await _fold_counter_shards(db, [project])
+    return project
+
+
+async def get_projects(db: AsyncSession, skip: int = 0, limit: int = 100, active_only: bool = False):
+    query = select(models.Project)
+    if active_only:
+        query = query.filter(models.Project.is_active == True)
+    result = await db.execute(query.order_by(models.Project.created_at.desc()).offset(skip).limit(limit))
+    return await _fold_counter_shards(db, result.scalars().all())
+
+
+async def get_projects_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 20,
+                            active_only: bool = False) -> Page:
+    query = select(models.Project)
+    if active_only:
+        query = query.filter(models.Project.is_active == True)
+    page = await keyset_page(db, query, models.Project.created_at, models.Project.id, cursor=cursor, limit=limit)
+    await _fold_counter_shards(db, page.items)
+    return page
 
 
-def get_projects(db: Session, skip: int = 0, limit: int = 100, active_only: bool = False):
-    query = db.query(models.Project)
+# JSON API: лише колонки schemas.Project, без гідратації ORM-об'єктів і identity map.
+# Елементи — рядки (Row) з атрибутами, які schemas.project_list_adapter читає напряму
+def _project_api_query(active_only: bool):
+    query = select(models.Project.id, models.Project.name, models.Project.description,
+                   models.Project.target_amount, models.Project.is_active,
+                   _current_amount_column().label("current_amount"), models.Project.created_at)
     if active_only:
         query = query.filter(models.Project.is_active == True)
-    return query.order_by(models.Project.created_at.desc()).offset(skip).limit(limit).all()
+    return query
+
+
+async def get_project_rows(db: AsyncSession, skip: int = 0, limit: int = 100, active_only: bool = False):
+    query = _project_api_query(active_only).order_by(models.Project.created_at.desc()).offset(skip).limit(limit)
+    return (await db.execute(query)).all()
 
 
-def create_project(db: Session, project: schemas.ProjectCreate):
-    db_project = models.Project(**project.dict())
+async def get_project_rows_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 20,
+                                active_only: bool = False) -> Page:
+    return await keyset_page(db, _project_api_query(active_only), models.Project.created_at, models.Project.id,
+                             cursor=cursor, limit=limit, scalars=False)
+
+
+# Дешеві запити для ETag: лише агрегати/версії, без завантаження самих рядків
+async def get_project_progress(db: AsyncSession, project_ids: Optional[List[int]] = None):
+    """(id, current_amount, target_amount) активних проєктів для живого прогресу (progress_stream)."""
+    query = select(models.Project.id, _current_amount_column().label("current_amount"),
+                   models.Project.target_amount).where(models.Project.is_active == True)
+    if project_ids is not None:
+        query = query.where(models.Project.id.in_(project_ids))
+    return (await db.execute(query)).all()
+
+
+def _latest_donation_id(project_id=None):
+    # Враховує пожертви в режимі шардів лічильника, коли рядок проєкту не оновлюється
+    query = select(models.Donation.id)
+    if project_id is not None:
+        query = query.where(models.Donation.project_id == project_id)
+    return query.order_by(models.Donation.donation_date.desc(), models.Donation.id.desc()).limit(1).scalar_subquery()
+
+
+async def get_projects_etag_state(db: AsyncSession, active_only: bool = False):
+    query = select(func.count(models.Project.id), func.sum(models.Project.version),
+                   func.max(models.Project.updated_at), _latest_donation_id())
+    if active_only:
+        query = query.filter(models.Project.is_active == True)
+    result = await db.execute(query)
+    return tuple(result.one())
+
+
+async def get_project_etag_state(db: AsyncSession, project_id: int):
+    """(version, is_active, id останньої пожертви) або None, якщо проєкту немає."""
+    result = await db.execute(
+        select(models.Project.version, models.Project.is_active, _latest_donation_id(project_id))
+        .filter(models.Project.id == project_id)
+    )
+    row = result.first()
+    return tuple(row) if row else None
+
+
+async def create_project(db: AsyncSession, project: schemas.ProjectCreate,
+                         idempotency_key: Optional[idempotency.IdempotencyKey] = None):
+    """З idempotency_key ключ фіксується в тій самій транзакції; для паралельного дубліката —
+    idempotency.DuplicateRequest (проєкт не створюється)."""
+    db_project = models.Project(**project.model_dump())
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
+    if idempotency_key is not None:
+        await db.flush()  # Потрібен id проєкту
+        await idempotency.record(db, idempotency_key, db_project.id)
+    await db.commit()
+    fragment_cache.invalidate()
+    await db.refresh(db_project)
     return db_project
 
 
-def update_project(db: Session, project_id: int, project_update: schemas.ProjectUpdate):
-    db_project = get_project(db, project_id)
+async def update_project(db: AsyncSession, project_id: int, project_update: schemas.ProjectUpdate):
+    db_project = await get_project(db, project_id)
     if not db_project:
         return None
-    update_data = project_update.dict(exclude_unset=True)
+    update_data = project_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_project, key, value)
+    db_project.version = models.Project.version + 1
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
+    await db.commit()
+    fragment_cache.invalidate()
+    await db.refresh(db_project)
     return db_project
 
 
-def delete_project(db: Session, project_id: int):
-    db_project = get_project(db, project_id)
+async def delete_project(db: AsyncSession, project_id: int):
+    db_project = await get_project(db, project_id)
     if not db_project:
         return None
     # Потрібно вирішити, що робити з пожертвами, якщо видаляється проєкт
     # Наприклад, видалити пов'язані пожертви або заборонити видалення, якщо є пожертви
     # Для простоти, поки що просто видаляємо проєкт
-    db.delete(db_project)
-    db.commit()
+    await db.delete(db_project)
+    await db.commit()
+    fragment_cache.invalidate()
     return db_project
 
 
 # Donation CRUD
-def create_donation(db: Session, donation: schemas.DonationCreate, user_id: int):
-    db_donation = models.Donation(**donation.dict(), user_id=user_id)
+async def _increment_project_amount(db: AsyncSession, project_id: int, amount: float) -> bool:
+    """Атомарно збільшує current_amount проєкту. Повертає False, якщо проєкт не існує."""
+    insert = dialect_insert(db) if DONATION_COUNTER_SHARDS > 1 else None
+    if insert is None:
+        # UPDATE ... SET current_amount = current_amount + :amount — без read-modify-write у Python
+        result = await db.execute(
+            update(models.Project).where(models.Project.id == project_id)
+            .values(current_amount=models.Project.current_amount + amount, version=models.Project.version + 1)
+        )
+        return result.rowcount > 0
 
+    if await db.scalar(select(models.Project.id).filter(models.Project.id == project_id)) is None:
+        return False
+    # Розкидаємо інкременти по шардах, щоб конкурентні пожертви не чекали на один рядок
+    stmt = insert(models.ProjectCounterShard).values(
+        project_id=project_id, shard=random.randrange(DONATION_COUNTER_SHARDS), amount=amount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.ProjectCounterShard.project_id, models.ProjectCounterShard.shard],
+        set_={"amount": models.ProjectCounterShard.amount + stmt.excluded.amount},
+    )
+    await db.execute(stmt)
+    return True
+
+
+async def create_donation(db: AsyncSession, donation: schemas.DonationCreate, user_id: int,
+                          idempotency_key: Optional[idempotency.IdempotencyKey] = None):
+    """З idempotency_key ключ фіксується в тій самій транзакції; для паралельного дубліката —
+    idempotency.DuplicateRequest (сума, агрегати й пожертва відкочуються)."""
     # Оновлюємо current_amount в проєкті
-    project = get_project(db, donation.project_id)
-    if project:
-        project.current_amount += donation.amount
-        db.add(project)  # SQLAlchemy відстежить зміни
-    else:  # Якщо проєкт не знайдено, це помилка
-        return None
+    if not await _increment_project_amount(db, donation.project_id, donation.amount):
+        return None  # Якщо проєкт не знайдено, це помилка
 
+    db_donation = models.Donation(**donation.model_dump(), user_id=user_id)
     db.add(db_donation)
-    db.commit()
-    db.refresh(db_donation)
+    await rollups.apply_donation(db, donation.project_id, user_id, donation.amount)
+    if idempotency_key is not None:
+        await db.flush()  # Потрібен id пожертви
+        await idempotency.record(db, idempotency_key, db_donation.id)
+    await db.commit()
+    fragment_cache.invalidate()  # Змінилась зібрана сума
+    progress_stream.publish_donation(donation.project_id, donation.amount)
+    await db.refresh(db_donation)
     return db_donation
 
 
-def get_donations_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Donation).filter(models.Donation.user_id == user_id) \
-        .order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit).all()
+async def bulk_create_donations(db: AsyncSession,
+                                rows: List[Tuple[int, schemas.DonationImport]]) -> List[Tuple[int, str]]:
+    """Вставляє пачку пожертв одним executemany і оновлює current_amount одним UPDATE на проєкт.
+    rows — (номер рядка, дані); повертає [(номер рядка, помилка)] для відхилених рядків."""
+    project_ids = {row.project_id for _, row in rows}
+    user_ids = {row.user_id for _, row in rows if row.user_id is not None}
+    existing_projects = set((await db.execute(
+        select(models.Project.id).where(models.Project.id.in_(project_ids)))).scalars())
+    existing_users = set((await db.execute(
+        select(models.User.id).where(models.User.id.in_(user_ids)))).scalars()) if user_ids else set()
+
+    errors = []
+    values = []
+    totals = defaultdict(float)
+    now = datetime.now(timezone.utc)
+    for row_number, row in rows:
+        if row.project_id not in existing_projects:
+            errors.append((row_number, f"Project {row.project_id} not found"))
+            continue
+        if row.user_id is not None and row.user_id not in existing_users:
+            errors.append((row_number, f"User {row.user_id} not found"))
+            continue
+        # executemany вимагає однаковий набір колонок, тому дату без значення заповнюємо тут;
+        # задану зводимо до UTC, щоб день в агрегатах збігався з перерахунком у SQL (rollups.rebuild)
+        values.append({
+            "amount": row.amount, "message": row.message, "project_id": row.project_id,
+            "user_id": row.user_id,
+            "donation_date": rollups.to_utc(row.donation_date) if row.donation_date else now,
+        })
+        totals[row.project_id] += row.amount
+
+    if values:
+        await db.execute(insert(models.Donation.__table__), values)
+        projects = models.Project.__table__
+        await db.execute(
+            update(projects).where(projects.c.id == bindparam("project_id_"))
+            .values(current_amount=projects.c.current_amount + bindparam("total"), version=projects.c.version + 1),
+            [{"project_id_": project_id, "total": total} for project_id, total in totals.items()],
+        )
+        await rollups.apply_donations(db, values)
+        await db.commit()
+        fragment_cache.invalidate()
+        for project_id, total in totals.items():
+            progress_stream.publish_donation(project_id, total)
+    return errors
+
+
+# Шаблони читають donation.donor / donation.project для кожного рядка. Ліниве завантаження в async-сесії
+# недоступне (і давало б N+1), тому обидва many-to-one зв'язки підтягуються тим самим запитом через JOIN
+_donation_with_relations = (joinedload(models.Donation.donor), joinedload(models.Donation.project))
+
+
+async def get_donations_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+    result = await db.execute(
+        select(models.Donation).options(*_donation_with_relations)
+        .filter(models.Donation.user_id == user_id)
+        .order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_donations_for_project(db: AsyncSession, project_id: int, skip: int = 0, limit: int = 100):
+    result = await db.execute(
+        select(models.Donation).options(*_donation_with_relations)
+        .filter(models.Donation.project_id == project_id)
+        .order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_all_donations(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(
+        select(models.Donation).options(*_donation_with_relations)
+        .order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+
+# Keyset-варіанти списків пожертв: сторінка N коштує стільки ж, скільки перша
+async def get_donations_by_user_page(db: AsyncSession, user_id: int, cursor: Optional[str] = None,
+                                     limit: int = 20) -> Page:
+    query = select(models.Donation).options(*_donation_with_relations).filter(models.Donation.user_id == user_id)
+    return await keyset_page(db, query, models.Donation.donation_date, models.Donation.id, cursor=cursor, limit=limit)
+
+
+async def get_donations_for_project_page(db: AsyncSession, project_id: int, cursor: Optional[str] = None,
+                                         limit: int = 20) -> Page:
+    query = select(models.Donation).options(*_donation_with_relations).filter(models.Donation.project_id == project_id)
+    return await keyset_page(db, query, models.Donation.donation_date, models.Donation.id, cursor=cursor, limit=limit)
 
 
-def get_donations_for_project(db: Session, project_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Donation).filter(models.Donation.project_id == project_id) \
-        .order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit).all()
+async def get_all_donations_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 20) -> Page:
+    query = select(models.Donation).options(*_donation_with_relations)
+    return await keyset_page(db, query, models.Donation.donation_date, models.Donation.id, cursor=cursor, limit=limit)
 
 
-def get_all_donations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Donation).order_by(models.Donation.donation_date.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+async def stream_donations_export(db: AsyncSession, project_id: Optional[int] = None,
+                                  date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                                  batch_size: int = 1000):
+    """Потоковий server-side курсор по пожертвах для експорту (без гідрації ORM-об'єктів).
+    Рядки читаються пачками по batch_size, тож пам'ять не залежить від розміру вибірки."""
+    query = select(
+        models.Donation.id, models.Donation.amount, models.Donation.donation_date, models.Donation.message,
+        models.Donation.user_id, models.User.email.label("donor_email"), models.User.full_name.label("donor_name"),
+        models.Donation.project_id, models.Project.name.label("project_name"),
+    ).outerjoin(models.User, models.Donation.user_id == models.User.id) \
+        .outerjoin(models.Project, models.Donation.project_id == models.Project.id)
+    if project_id is not None:
+        query = query.filter(models.Donation.project_id == project_id)
+    if date_from is not None:
+        query = query.filter(models.Donation.donation_date >= bind_datetime(db, date_from))
+    if date_to is not None:
+        query = query.filter(models.Donation.donation_date < bind_datetime(db, date_to))
+    query = query.order_by(models.Donation.donation_date, models.Donation.id)
+    return await db.stream(query.execution_options(yield_per=batch_size))
@@ -1,26 +1,17 @@
 from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from . import  crud, models, auth
+from . import models, auth
 from .database import get_db
 
 
-async def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -> Optional[models.User]:
+async def get_current_user_optional(request: Request, db: AsyncSession = Depends(get_db)) -> Optional[models.User]:
     """Returns user if logged in, or None otherwise. For public pages that can show user-specific info."""
     token = request.cookies.get("access_token")
     if not token:
         return None
-    try:
-        payload = auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-    except auth.JWTError:
-        return None
-
-    user = crud.get_user_by_email(db, email=email)
-    return user
+    return await auth.get_user_by_token(token, db)
 
 
 async def get_current_user(current_user_optional: Optional[models.User] = Depends(get_current_user_optional)):
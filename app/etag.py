@@ -0,0 +1,32 @@
+# Умовні GET-запити: сильні ETag та відповідь 304 до рендеру шаблону чи серіалізації
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match використовує слабке порівняння, тож префікс W/ ігноруємо
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str, cache_control: str = "no-cache") -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def user_etag_part(current_user):
+    # HTML-сторінки персоналізовані (шапка, адмін-дії), тому ETag залежить і від користувача
+    if not current_user:
+        return None
+    return current_user.id, current_user.role, current_user.full_name
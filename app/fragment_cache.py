@@ -0,0 +1,37 @@
+# Кеш відрендерених HTML-фрагментів списку проєктів (однакових для всіх відвідувачів).
+# Персоналізовані частини сторінки (шапка з current_user) рендеряться на кожен запит окремо.
+import os
+from typing import Optional
+
+from .user_cache import TTLCache
+
+FRAGMENT_CACHE_TTL_SECONDS = float(os.getenv("FRAGMENT_CACHE_TTL_SECONDS", 30))
+FRAGMENT_CACHE_MAX_SIZE = int(os.getenv("FRAGMENT_CACHE_MAX_SIZE", 1000))
+
+fragment_cache = TTLCache(FRAGMENT_CACHE_MAX_SIZE, FRAGMENT_CACHE_TTL_SECONDS)
+_generation = 0
+
+
+def generation() -> int:
+    return _generation
+
+
+def get(key) -> Optional[dict]:
+    return fragment_cache.get(key)
+
+
+def set(key, value: dict, loaded_generation: int):
+    # Якщо поки ми читали дані з БД кеш встигли інвалідувати, не зберігаємо застарілий фрагмент
+    if loaded_generation == _generation:
+        fragment_cache.set(key, value)
+
+
+def invalidate():
+    """Викликається при будь-якій зміні проєктів або сум пожертв."""
+    global _generation
+    _generation += 1
+    fragment_cache.clear()
+
+
+def render(templates, name: str, request, **context) -> str:
+    return templates.get_template(name).render(request=request, **context)
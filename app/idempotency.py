@@ -0,0 +1,107 @@
+# Ключі ідемпотентності для POST-форм, що створюють дані (пожертва, новий проєкт).
+# Клієнт передає заголовок Idempotency-Key або приховане поле idempotency_key (його генерує сама форма).
+# Повтор із тим самим ключем отримує той самий редирект, а дані не створюються вдруге.
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .database import dialect_insert
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_FORM_FIELD = "idempotency_key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 100
+# Скільки зберігається ключ; старші записи видаляє фонове прибирання
+IDEMPOTENCY_KEY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 3600))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", 3600))
+
+keys = models.IdempotencyKey.__table__
+
+
+@dataclass(frozen=True)
+class IdempotencyKey:
+    user_id: int
+    key: str
+    scope: str  # Що створює запит: "donation" / "project"; той самий ключ для іншої дії — помилка клієнта
+
+
+class DuplicateRequest(Exception):
+    """Паралельний запит із тим самим ключем уже зафіксував результат; транзакцію відкочено."""
+
+
+def new_form_key() -> str:
+    """Значення прихованого поля для щойно відрендереної форми."""
+    return uuid.uuid4().hex
+
+
+def get_key(request: Request, user_id: int, scope: str, form_key: Optional[str]) -> Optional[IdempotencyKey]:
+    key = request.headers.get(IDEMPOTENCY_HEADER) or form_key
+    if not key:
+        return None
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"{IDEMPOTENCY_HEADER} must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+    return IdempotencyKey(user_id=user_id, key=key, scope=scope)
+
+
+async def get_resource_id(db: AsyncSession, idempotency_key: IdempotencyKey) -> Optional[int]:
+    """id створеного раніше об'єкта, якщо запит із цим ключем уже виконувався (один SELECT по первинному ключу)."""
+    row = (await db.execute(
+        select(keys.c.scope, keys.c.resource_id)
+        .where(keys.c.user_id == idempotency_key.user_id, keys.c.key == idempotency_key.key)
+    )).first()
+    if row is None:
+        return None
+    if row.scope != idempotency_key.scope:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    return row.resource_id
+
+
+async def record(db: AsyncSession, idempotency_key: IdempotencyKey, resource_id: int):
+    """Фіксує ключ у поточній транзакції, перед commit створення об'єкта.
+    Паралельний дублікат розв'язує унікальність первинного ключа: у PostgreSQL другий INSERT чекає
+    на commit першого й нічого не вставляє — тоді транзакцію відкочуємо і кидаємо DuplicateRequest."""
+    values = {"user_id": idempotency_key.user_id, "key": idempotency_key.key, "scope": idempotency_key.scope,
+              "resource_id": resource_id, "created_at": datetime.now(timezone.utc)}
+    insert_stmt = dialect_insert(db)
+    if insert_stmt is not None:
+        result = await db.execute(insert_stmt(keys).values(**values).on_conflict_do_nothing())
+        inserted = result.rowcount == 1
+    else:
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(keys).values(**values))
+            inserted = True
+        except IntegrityError:
+            inserted = False
+    if not inserted:
+        await db.rollback()
+        raise DuplicateRequest(idempotency_key.key)
+
+
+async def sweep_expired(db: AsyncSession) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    result = await db.execute(delete(keys).where(keys.c.created_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+async def run_sweeper():
+    """Фонова задача (див. startup_event): раз на IDEMPOTENCY_SWEEP_INTERVAL видаляє прострочені ключі."""
+    from .database import SessionLocal
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_SWEEP_INTERVAL)
+        try:
+            async with SessionLocal() as db:
+                await sweep_expired(db)
+        except Exception as e:
+            print(f"Idempotency key sweep failed: {e!r}")
@@ -1,26 +1,44 @@
-from fastapi import FastAPI, Depends, Request, HTTPException, status
+from fastapi import FastAPI, Depends, Query, Request, HTTPException, Response, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import os
 from dotenv import load_dotenv
-from typing import List
-from .mongo_db import close_mongo_connection, client as mongo_client
-from . import models, crud, schemas, auth # <--- ПРАВИЛЬНИЙ РЯДОК
-from .database import engine, get_db, SessionLocal
+from typing import List, Optional
+from .mongo_db import close_mongo_connection, get_client as get_mongo_client
+from .mongo_crud import activity_log_writer
+from .progress_stream import progress_broadcaster
+from . import models, crud, schemas, auth, bootstrap, fragment_cache, rollups, metrics, profiler, views, idempotency, rate_limit # <--- ПРАВИЛЬНИЙ РЯДОК
+from .templating import templates, warm_up as warm_up_templates
+from .database import add_engine_listener, dispose_engines, get_db, get_read_db
+from .pagination import InvalidCursor
+from .etag import make_etag, is_not_modified, not_modified
 from .dependencies import get_current_user_optional, get_current_admin_user, get_current_user
 from .routers import auth_router, projects_router, donations_router  # users_router (якщо є)
 
 load_dotenv()
 
-# Створюємо таблиці в БД (зазвичай для цього використовують Alembic)
-# models.Base.metadata.create_all(bind=engine) # Робимо це один раз при старті
+# orjson (якщо встановлений) серіалізує JSON-відповіді в кілька разів швидше за стандартний json
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+
+# Таблиці створюються міграціями Alembic (migrations/), див. app/migrate.py і app/bootstrap.py
+
+# Скільки останніх днів показувати в денній статистиці адмін-панелі
+DASHBOARD_DAYS = int(os.getenv("DASHBOARD_DAYS", 14))
 
 app = FastAPI(
     title="Система Добровільних Пожертв",
     description="RESTfull API для управління пожертвами медичній установі. Контент генерується на сервері.",
     version="1.0.0",
+    # Власні /openapi.json, /docs і /redoc нижче: схема генерується один раз і віддається готовими байтами
+    openapi_url=None,
+    default_response_class=DefaultJSONResponse,
     openapi_tags=[
         {"name": "HTML Pages", "description": "Endpoints that return HTML content"},
         {"name": "Authentication", "description": "User authentication and registration (HTML & API)"},
@@ -31,39 +49,15 @@ app = FastAPI(
 )
 
 
-# Створення таблиць (якщо їх немає) та початкового адміна
-def create_initial_data():
-    db = SessionLocal()
-    try:
-        # Створення таблиць
-        models.Base.metadata.create_all(bind=engine)
-
-        # Створення адміна, якщо його немає
-        admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
-        admin_password = os.getenv("ADMIN_PASSWORD", "adminpassword")
-
-        admin_user = crud.get_user_by_email(db, email=admin_email)
-        if not admin_user:
-            user_in = schemas.UserCreate(
-                email=admin_email,
-                password=admin_password,
-                full_name="Admin User",
-                role="admin"
-            )
-            crud.create_user(db=db, user=user_in)
-            print(f"Admin user {admin_email} created with password {admin_password}")
-        else:
-            print(f"Admin user {admin_email} already exists.")
-
-    finally:
-        db.close()
-
-
-# Викликаємо функцію при старті додатку
-create_initial_data()
-
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+
+# Метрики Prometheus: латентність по маршрутах + кількість і час SQL на запит (див. app/metrics.py)
+app.add_middleware(metrics.MetricsMiddleware)
+# Engine створюються ліниво (app/database.py), тож підключаємось до кожного в момент створення
+add_engine_listener(metrics.instrument_engine)
+# Профайлер SQL для адмінів (X-Profile: 1) і журнал повільних запитів (див. app/profiler.py)
+app.add_middleware(profiler.ProfilerMiddleware)
+add_engine_listener(profiler.instrument_engine)
 
 # Підключення роутерів
 app.include_router(auth_router.router, prefix="/auth", tags=["Authentication"])
@@ -71,67 +65,205 @@ app.include_router(projects_router.router, prefix="/projects", tags=["Projects"]
 app.include_router(donations_router.router, prefix="/donations", tags=["Donations"])
 
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+
 # app.include_router(users_router.router, prefix="/users", tags=["Users"]) # Якщо буде окремий роутер для користувачів
 
 @app.get("/", response_class=HTMLResponse, tags=["HTML Pages"])
-async def read_root(request: Request, db: Session = Depends(get_db),
+async def read_root(request: Request, db: AsyncSession = Depends(get_read_db),
                     current_user: models.User = Depends(get_current_user_optional)):
-    projects = crud.get_projects(db, active_only=True, limit=10)
+    # Список проєктів однаковий для всіх, тому береться з кешу фрагментів; шапка з current_user — ні
+    cache_key = ("index", str(request.base_url))
+    fragment = fragment_cache.get(cache_key)
+    if fragment is None:
+        generation = fragment_cache.generation()
+        projects = views.project_views(await crud.get_projects(db, active_only=True, limit=10))
+        await views.release(db)
+        fragment = {"html": fragment_cache.render(templates, "fragments/index_projects.html", request,
+                                                  projects=projects)}
+        fragment_cache.set(cache_key, fragment, generation)
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "projects": projects,
+        "projects_html": fragment["html"],
         "current_user": current_user
     })
 
 
 @app.get("/admin", response_class=HTMLResponse, tags=["HTML Pages"])
-async def admin_dashboard(request: Request, current_user: models.User = Depends(get_current_admin_user)):
-    # Адмін може бачити статистику або мати швидкі посилання
-    return templates.TemplateResponse("admin/dashboard.html", {"request": request, "current_user": current_user})
+async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_read_db),
+                          current_user: models.User = Depends(get_current_admin_user)):
+    # Статистика читається лише з денних агрегатів, а не сканом таблиці donations
+    project_totals = await rollups.get_project_totals(db)
+    daily_totals = await rollups.get_daily_totals(db, days=DASHBOARD_DAYS)
+    await views.release(db)  # Рядки (Row) вже відокремлені від сесії
+    return templates.TemplateResponse("admin/dashboard.html", {
+        "request": request,
+        "current_user": current_user,
+        "project_totals": project_totals,
+        "daily_totals": daily_totals,
+    })
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["HTML Pages"])
+async def read_request_profile(profile_id: str, current_user: models.User = Depends(get_current_admin_user)):
+    report = profiler.profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found or expired")
+    return report
+
+
+@app.get("/api/stats/donations", response_model=schemas.DonationStats, tags=["Stats API (Admin Only)"])
+async def donation_stats_api(days: int = Query(30, ge=1, le=3660), project_id: Optional[int] = None,
+                             db: AsyncSession = Depends(get_read_db),
+                             current_user: models.User = Depends(auth.get_current_admin_user)):
+    projects = await rollups.get_project_totals(db)
+    if project_id is not None:
+        projects = [row for row in projects if row.id == project_id]
+    return schemas.DonationStats(
+        projects=[schemas.ProjectDonationTotals(project_id=row.id, name=row.name, total_amount=row.total_amount,
+                                                donation_count=row.donation_count) for row in projects],
+        daily=[schemas.DailyDonationTotals(**row._mapping)
+               for row in await rollups.get_daily_totals(db, days=days, project_id=project_id)],
+    )
 
 
 # OpenAPI документація (для JSON API частини, якщо вона буде)
 # Наприклад, CRUD для проєктів (API частина)
 # Ці ендпоінти не будуть використовуватися для HTML, але можуть бути корисні для тестування або майбутнього API
+def json_bytes_response(adapter, value, status_code: int = status.HTTP_200_OK, headers: Optional[dict] = None):
+    """Валідація з атрибутів і серіалізація TypeAdapter'ом одразу в байти, в обхід jsonable_encoder FastAPI.
+    response_model на маршруті лишається для документації OpenAPI."""
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
 @app.post("/api/projects/", response_model=schemas.Project, tags=["Projects API (Admin Only)"],
           status_code=status.HTTP_201_CREATED)
-def create_project_api(project: schemas.ProjectCreate, db: Session = Depends(get_db),
+async def create_project_api(project: schemas.ProjectCreate, db: AsyncSession = Depends(get_db),
                        current_user: models.User = Depends(
                            auth.get_current_admin_user)):  # Використовуємо інший get_current_admin_user для API
-    return crud.create_project(db=db, project=project)
+    db_project = await crud.create_project(db=db, project=project)
+    return json_bytes_response(schemas.project_adapter, db_project, status_code=status.HTTP_201_CREATED)
 
 
 @app.get("/api/projects/", response_model=List[schemas.Project], tags=["Projects API (Public)"])
-def read_projects_api(skip: int = 0, limit: int = 10, db: Session = Depends(get_db), active_only: bool = True):
-    projects = crud.get_projects(db, skip=skip, limit=limit, active_only=active_only)
-    return projects
+async def read_projects_api(request: Request, skip: int = 0, limit: int = 10,
+                            cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db), active_only: bool = True):
+    # Незмінений список -> 304 після одного агрегатного запиту, без вибірки й серіалізації рядків
+    etag = make_etag("api-projects", await crud.get_projects_etag_state(db, active_only=active_only),
+                     skip, limit, cursor)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if skip:  # Старий режим з OFFSET лишається для сумісності
+        rows = await crud.get_project_rows(db, skip=skip, limit=limit, active_only=active_only)
+        return json_bytes_response(schemas.project_list_adapter, rows, headers=headers)
+    # Курсори повертаються в заголовках, щоб тіло відповіді лишилось простим списком
+    page = await crud.get_project_rows_page(db, cursor=cursor, limit=limit, active_only=active_only)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    if page.prev_cursor:
+        headers["X-Prev-Cursor"] = page.prev_cursor
+    return json_bytes_response(schemas.project_list_adapter, page.items, headers=headers)
 
 
 # ... і так далі для інших API ендпоінтів, якщо потрібно
 
-# Приклад для OpenAPI (можна додати більше)
-@app.get("/openapi.json", include_in_schema=False)
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# OpenAPI: схема не змінюється під час роботи, тому генерується й серіалізується один раз (див. startup_event)
+OPENAPI_URL = "/openapi.json"
+_openapi_cache: Optional[tuple] = None
+
+
+def get_openapi_bytes() -> tuple:
+    """(JSON-байти схеми, ETag); перший виклик генерує схему для всіх роутерів, далі — з пам'яті."""
+    global _openapi_cache
+    if _openapi_cache is None:
+        body = JSONResponse(app.openapi()).body
+        _openapi_cache = (body, make_etag("openapi", body))
+    return _openapi_cache
+
+
+@app.get(OPENAPI_URL, include_in_schema=False)
 async def get_open_api_endpoint(
-        current_user: models.User = Depends(auth.get_current_user_api)):  # Використовуємо API версію get_current_user
+        request: Request,
+        token_subject: Optional[str] = Depends(auth.get_token_subject_api)):  # Перевірка токена без запиту до БД
     # Тут можна додати логіку, хто може бачити документацію
     # Наприклад, тільки адміни
     # if not current_user or current_user.role != "admin":
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    return app.openapi()
+    body, etag = get_openapi_bytes()
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-@app.on_event("startup")
-async def startup_event():
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui_html():
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=app.title + " - Swagger UI",
+                               oauth2_redirect_url="/docs/oauth2-redirect")
+
+
+@app.get("/docs/oauth2-redirect", include_in_schema=False)
+async def swagger_ui_redirect():
+    return get_swagger_ui_oauth2_redirect_html()
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_html():
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=app.title + " - ReDoc")
+
+_background_tasks = []
+
+
+async def check_mongo_connection():
     try:
         # Перевірка підключення до MongoDB
-        await mongo_client.admin.command('ping')
+        await get_mongo_client().admin.command('ping')
         print("Successfully connected to MongoDB!")
     except Exception as e:
         print(f"Could not connect to MongoDB: {e}")
-    # Тут можна додати create_initial_data() для SQL, якщо потрібно
-    create_initial_data()
+        # Логи активності одразу підуть у локальний spool, без очікування таймаутів
+        activity_log_writer.breaker.trip()
+
+
+@app.on_event("startup")
+async def startup_event():
+    # Недоступна MongoDB не затримує старт на MONGO_SERVER_SELECTION_TIMEOUT_MS: перевірка йде у фоні
+    _background_tasks.append(asyncio.create_task(check_mongo_connection()))
+    # Фоновий запис логів активності пачками
+    activity_log_writer.start()
+    # Розсилка живого прогресу зборів (SSE)
+    progress_broadcaster.start()
+    # Видалення прострочених ключів ідемпотентності
+    _background_tasks.append(asyncio.create_task(idempotency.run_sweeper()))
+    if rate_limit.LOGIN_RATE_LIMIT_BACKEND == "db":
+        _background_tasks.append(asyncio.create_task(rate_limit.run_sweeper()))
+    # Схема OpenAPI генерується тут, а не на першому запиті документації
+    get_openapi_bytes()
+    # Шаблони теж: перший запит після деплою рендерить так само швидко, як і наступні
+    warm_up_templates()
+    # Міграції й адмін: на проді — python -m app.bootstrap один раз на розгортання і BOOTSTRAP_ON_STARTUP=false
+    if bootstrap.BOOTSTRAP_ON_STARTUP:
+        await bootstrap.bootstrap()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # Спершу дописуємо чергу логів, поки з'єднання з MongoDB ще відкрите
+    await activity_log_writer.stop()
+    await progress_broadcaster.stop()
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
     await close_mongo_connection()
-    print("MongoDB connection closed.")
\ No newline at end of file
+    print("MongoDB connection closed.")
+    await dispose_engines()
+    auth.shutdown_password_executor()
\ No newline at end of file
@@ -0,0 +1,272 @@
+# Метрики у текстовому форматі Prometheus (/metrics) без зовнішніх залежностей:
+# латентність і статуси по маршрутах, запити в обробці, кількість і час SQL на запит, команди MongoDB.
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from pymongo import monitoring
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Команди MongoDB моніторяться з потоків драйвера, тому оновлення під локом
+        self._lock = threading.Lock()
+
+    def header(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> str:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + "".join(
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}\n"
+            for labels, value in items
+        )
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [лічильники по бакетах (не кумулятивні) + бакет +Inf, сума]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(labels)
+            if item is None:
+                item = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            item[0][index] += 1
+            item[1] += value
+
+    def count(self, *labels) -> int:
+        item = self._values.get(labels)
+        return sum(item[0]) if item else 0
+
+    def render(self) -> str:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = [self.header()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}\n")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}\n")
+            lines.append(f"{self.name}_count{label_text} {cumulative}\n")
+        return "".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics)
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being processed.", ("method",)))
+http_request_db_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request.", ("route",), QUERY_COUNT_BUCKETS))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("route",)))
+db_statements_total = registry.register(Counter(
+    "db_statements_total", "SQL statements executed (including background work).", ("operation",)))
+db_statement_errors_total = registry.register(Counter(
+    "db_statement_errors_total", "SQL statements that raised an error.", ()))
+db_statement_duration_seconds = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time.", ("operation",)))
+mongo_commands_total = registry.register(Counter(
+    "mongo_commands_total", "MongoDB commands by name and outcome.", ("command", "outcome")))
+mongo_command_duration_seconds = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round-trip time.", ("command",)))
+sse_subscribers = registry.register(Gauge(
+    "sse_subscribers", "Open live progress (SSE) connections.", ()))
+sse_events_total = registry.register(Counter(
+    "sse_events_total", "Live progress events queued to subscribers.", ()))
+sse_dropped_subscribers_total = registry.register(Counter(
+    "sse_dropped_subscribers_total", "Live progress subscribers disconnected for falling behind.", ()))
+sse_resyncs_total = registry.register(Counter(
+    "sse_resyncs_total", "Live progress resynchronisations with the database.", ()))
+login_rate_limit_total = registry.register(Counter(
+    "login_rate_limit_total", "Login attempts checked by the rate limiter.", ("scope", "outcome")))
+
+
+class RequestStats:
+    __slots__ = ("db_statements", "db_seconds")
+
+    def __init__(self):
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+
+# Статистика поточного запиту; async-сесії SQLAlchemy виконують запити в тому ж контексті (greenlet)
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _route_label(scope) -> str:
+    # Шаблон маршруту (/projects/{project_id}), а не фактичний шлях — щоб кількість серій не росла
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware (без BaseHTTPMiddleware, щоб не додавати задачу й копію тіла на кожен запит)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_progress.dec(method)
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(duration, method, route)
+            http_request_db_statements.observe(stats.db_statements, route)
+            http_request_db_seconds.observe(stats.db_seconds, route)
+
+
+def _operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:  # Слухач підключено посеред виконання інструкції
+        return
+    duration = time.perf_counter() - start
+    operation = _operation(statement)
+    db_statements_total.inc(operation)
+    db_statement_duration_seconds.observe(duration, operation)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_statements += 1
+        stats.db_seconds += duration
+
+
+def _handle_error(exception_context):
+    db_statement_errors_total.inc()
+
+
+def instrument_engine(engine):
+    """Підключає лічильники SQL до engine (sync або async). Повторний виклик нічого не робить."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Моніторинг команд Motor/PyMongo. Події приходять з потоків драйвера, тож рахуються
+    сумарно (переважно це фоновий запис activity_logs), без прив'язки до HTTP-запиту."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_commands_total.inc(event.command_name, "success")
+        mongo_command_duration_seconds.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        mongo_commands_total.inc(event.command_name, "failure")
+        mongo_command_duration_seconds.observe(event.duration_micros / 1e6, event.command_name)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,74 @@
+# Застосування міграцій Alembic замість Base.metadata.create_all.
+# Запуск вручну: python -m app.migrate [revision]
+# alembic імпортується лише під час самого оновлення: перевірка актуальності схеми (bootstrap) без нього
+import asyncio
+import os
+import re
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .database import ASYNC_DATABASE_URL
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSIONS_DIR = os.path.join(PROJECT_ROOT, "migrations", "versions")
+# Ревізія, що відповідає схемі, яку раніше створював create_all
+BASELINE_REVISION = "0001_initial"
+
+_REVISION_LINE = re.compile(r"^(revision|down_revision)\s*=\s*[\"']?([\w.-]+)", re.MULTILINE)
+
+
+def get_alembic_config(configure_logger: bool = True):
+    from alembic.config import Config
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    config.attributes["configure_logger"] = configure_logger
+    return config
+
+
+async def _has_unversioned_schema() -> bool:
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+    finally:
+        await engine.dispose()
+    return "users" in tables and "alembic_version" not in tables
+
+
+def head_revisions() -> set:
+    """Головні ревізії з файлів migrations/versions — без завантаження Alembic (ScriptDirectory це ~0.5 с)."""
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name), encoding="utf-8") as f:
+            values = dict(_REVISION_LINE.findall(f.read()))
+        if "revision" in values:
+            revisions.add(values["revision"])
+            parents.add(values.get("down_revision"))
+    return revisions - parents
+
+
+async def current_revisions(conn) -> set:
+    """Ревізії, записані в alembic_version (порожньо, якщо схему ще не створено)."""
+    has_table = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("alembic_version"))
+    if not has_table:
+        return set()
+    return set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+
+
+def upgrade_database(revision: str = "head", configure_logger: bool = True):
+    """Оновлює схему до revision. Блокуючий виклик: з async-коду запускати через asyncio.to_thread."""
+    from alembic import command
+    config = get_alembic_config(configure_logger)
+    # База, створена ще через create_all: позначаємо її базовою ревізією, далі звичайний upgrade
+    if asyncio.run(_has_unversioned_schema()):
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    upgrade_database(sys.argv[1] if len(sys.argv) > 1 else "head")
@@ -1,9 +1,15 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text
+from datetime import datetime, timezone
+
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -25,7 +31,12 @@ class Project(Base):
     target_amount = Column(Float, nullable=False)
     current_amount = Column(Float, default=0.0)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Значення з Python, а не лише server_default: у SQLite CURRENT_TIMESTAMP пише "YYYY-MM-DD HH:MM:SS"
+    # без ".ffffff", і такі рядки впорядковуються інакше, ніж записані SQLAlchemy (див. app/pagination.py)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    # Для ETag: version збільшується при кожній зміні проєкту (в т.ч. current_amount)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     donations = relationship("Donation", back_populates="project")
 
@@ -34,10 +45,68 @@ class Donation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
-    donation_date = Column(DateTime(timezone=True), server_default=func.now())
+    donation_date = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     message = Column(String(500), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     project_id = Column(Integer, ForeignKey("projects.id"))
 
     donor = relationship("User", back_populates="donations")
-    project = relationship("Project", back_populates="donations")
\ No newline at end of file
+    project = relationship("Project", back_populates="donations")
+
+class ProjectCounterShard(Base):
+    # Частини лічильника current_amount для "гарячих" проєктів (DONATION_COUNTER_SHARDS > 1):
+    # пожертви інкрементують випадковий шард, а при читанні суми шардів додаються до projects.current_amount
+    __tablename__ = "project_counter_shards"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    amount = Column(Float, nullable=False, default=0.0)
+
+class DonationDailyRollup(Base):
+    # Попередньо агреговані пожертви по проєкту за день (UTC) — дашборд читає лише цю таблицю
+    __tablename__ = "donation_daily_rollups"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    donation_count = Column(Integer, nullable=False, default=0)
+    unique_donors = Column(Integer, nullable=False, default=0)
+
+class DonationDailyDonor(Base):
+    # Які донори вже враховані в unique_donors за день (для інкрементального підрахунку)
+    __tablename__ = "donation_daily_donors"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+
+class IdempotencyKey(Base):
+    # Ключі ідемпотентності POST-форм (див. app/idempotency.py); записи старші за TTL видаляються фоново
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    scope = Column(String(20), nullable=False)
+    resource_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RateLimitBucket(Base):
+    # Спільні між воркерами відра обмеження спроб входу (LOGIN_RATE_LIMIT_BACKEND=db, див. app/rate_limit.py)
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(300), primary_key=True)  # "ip:1.2.3.4" / "username:user@example.com"
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # Unix time
+
+
+# Складені індекси під реальні форми запитів у crud.py (фільтр + сортування + id для keyset-пагінації)
+# Змінюючи їх, додайте відповідну міграцію в migrations/versions
+Index("ix_projects_active_created", Project.is_active, Project.created_at.desc(), Project.id.desc())
+Index("ix_projects_created", Project.created_at.desc(), Project.id.desc())
+Index("ix_donations_project_date", Donation.project_id, Donation.donation_date.desc(), Donation.id.desc())
+Index("ix_donations_user_date", Donation.user_id, Donation.donation_date.desc(), Donation.id.desc())
+Index("ix_donations_date", Donation.donation_date.desc(), Donation.id.desc())
+Index("ix_donation_daily_rollups_day", DonationDailyRollup.day)
+Index("ix_idempotency_keys_created", IdempotencyKey.created_at)
@@ -1,17 +1,267 @@
 # app/mongo_crud.py (новий файл)
-from .mongo_db import activity_log_collection
+import asyncio
+import os
+from typing import List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from .circuit_breaker import CircuitBreaker
+from .mongo_db import get_activity_log_collection
 from .schemas import ActivityLogBase # Або повний шлях до схеми
-from typing import List
 from bson import ObjectId # Для роботи з ObjectId, якщо потрібно
 
+ACTIVITY_LOG_QUEUE_SIZE = int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", 10000))
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", 500))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", 1.0))
+# Скільки чекати на insert_many, перш ніж вважати MongoDB недоступною
+ACTIVITY_LOG_WRITE_TIMEOUT = float(os.getenv("ACTIVITY_LOG_WRITE_TIMEOUT", 2.0))
+ACTIVITY_LOG_SPOOL_PATH = os.getenv("ACTIVITY_LOG_SPOOL_PATH", "activity_log_spool.jsonl")
+# Межа розміру spool: при довгій недоступності MongoDB новіші події відкидаються, а не заповнюють диск
+ACTIVITY_LOG_SPOOL_MAX_BYTES = int(os.getenv("ACTIVITY_LOG_SPOOL_MAX_BYTES", 100 * 1024 * 1024))
+MONGO_BREAKER_FAILURE_THRESHOLD = int(os.getenv("MONGO_BREAKER_FAILURE_THRESHOLD", 3))
+MONGO_BREAKER_RESET_TIMEOUT = float(os.getenv("MONGO_BREAKER_RESET_TIMEOUT", 30.0))
+
+
+class ActivityLogSpool:
+    """Локальний append-only файл (JSON Lines) для подій, які не вдалося записати в MongoDB.
+    Усі методи блокують (файловий I/O) — з async-коду викликати через asyncio.to_thread."""
+
+    def __init__(self, path: str, max_bytes: int = ACTIVITY_LOG_SPOOL_MAX_BYTES):
+        self.path = path
+        self.replay_path = path + ".replay"
+        self.max_bytes = max_bytes
+
+    def has_data(self) -> bool:
+        return os.path.exists(self.replay_path) or (os.path.exists(self.path) and os.path.getsize(self.path) > 0)
+
+    def append(self, docs: list) -> int:
+        """Дописує події, поки файл не досяг max_bytes; повертає, скільки записано (решта відкидається)."""
+        # _id призначаємо тут, щоб повторне відтворення після часткової помилки не створило дублікатів
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        written = 0
+        with open(self.path, "a", encoding="utf-8") as f:
+            for doc in docs:
+                doc.setdefault("_id", ObjectId())
+                line = json_util.dumps(doc) + "\n"
+                size += len(line.encode("utf-8"))
+                if size > self.max_bytes:
+                    break
+                f.write(line)
+                written += 1
+        return written
+
+    def open_replay(self):
+        """Переносить накопичене у файл відтворення (нові події пишуться вже в чистий spool) і відкриває його.
+        None — відтворювати нічого."""
+        if not os.path.exists(self.replay_path):
+            if not os.path.exists(self.path):
+                return None
+            os.replace(self.path, self.replay_path)
+        return open(self.replay_path, encoding="utf-8")
+
+    @staticmethod
+    def read_batch(f, batch_size: int) -> list:
+        """Наступні batch_size подій з файлу відтворення: у пам'яті не більше однієї пачки."""
+        docs = []
+        for line in f:
+            if line.strip():
+                docs.append(json_util.loads(line))
+                if len(docs) >= batch_size:
+                    break
+        return docs
+
+    def commit(self):
+        if os.path.exists(self.replay_path):
+            os.remove(self.replay_path)
+
+
+class ActivityLogWriter:
+    """Фоновий запис логів активності: обробники лише кладуть подію в чергу,
+    а окрема задача пише їх пачками через insert_many (за розміром пачки або за часом)."""
+
+    def __init__(self, collection=None, max_queue: int = ACTIVITY_LOG_QUEUE_SIZE,
+                 batch_size: int = ACTIVITY_LOG_BATCH_SIZE, flush_interval: float = ACTIVITY_LOG_FLUSH_INTERVAL,
+                 write_timeout: float = ACTIVITY_LOG_WRITE_TIMEOUT, spool: Optional[ActivityLogSpool] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self._collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_timeout = write_timeout
+        self.spool = spool or ActivityLogSpool(ACTIVITY_LOG_SPOOL_PATH)
+        self.breaker = breaker or CircuitBreaker(MONGO_BREAKER_FAILURE_THRESHOLD, MONGO_BREAKER_RESET_TIMEOUT)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.queue_high_water = 0
+
+    @property
+    def collection(self):
+        # Клієнт MongoDB створюється при першому записі, а не під час імпорту
+        if self._collection is None:
+            self._collection = get_activity_log_collection()
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дописує все, що лишилось у черзі, і зупиняє фонову задачу (для shutdown)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    def enqueue(self, log_data: ActivityLogBase) -> bool:
+        """Не блокує. Якщо черга переповнена, подія відкидається і рахується в dropped."""
+        try:
+            self._queue.put_nowait(log_data.model_dump(by_alias=True))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        self.queue_high_water = max(self.queue_high_water, self._queue.qsize())
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.opened_count,
+            "queue_size": self._queue.qsize(),
+            "queue_max_size": self._queue.maxsize,
+            "queue_high_water": self.queue_high_water,
+        }
+
+    async def _collect_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        batch = []
+        while len(batch) < self.batch_size:
+            # Спершу забираємо все, що вже є в черзі, без очікування
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            timeout = deadline - loop.time()
+            if len(batch) >= self.batch_size or timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _insert(self, docs: list):
+        try:
+            await asyncio.wait_for(self.collection.insert_many(docs, ordered=False), self.write_timeout)
+        except BulkWriteError as e:
+            # Дублікати _id при повторному відтворенні spool — не помилка
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def _spool(self, batch: list):
+        try:
+            written = await asyncio.to_thread(self.spool.append, batch)
+        except OSError as e:
+            self.failed += len(batch)
+            print(f"Could not spool {len(batch)} activity log entries: {e}")
+            return
+        self.spooled += written
+        if written < len(batch):
+            self.dropped += len(batch) - written
+            print(f"Activity log spool is full ({self.spool.max_bytes} bytes), "
+                  f"dropped {len(batch) - written} entries")
+
+    async def _flush(self, batch: list):
+        self.batches += 1
+        # Поки ланцюг розімкнений, навіть не пробуємо MongoDB — одразу в локальний spool
+        if not self.breaker.allow_request():
+            await self._spool(batch)
+            return
+        try:
+            await self._insert(batch)
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Could not write {len(batch)} activity log entries, spooling: {e!r}")
+            await self._spool(batch)
+            return
+        self.breaker.record_success()
+        self.written += len(batch)
+        if self.spool.has_data():
+            await self._replay_spool()
+
+    async def _replay_spool(self):
+        """Після відновлення MongoDB записує накопичений spool пачками, читаючи файл по одній пачці."""
+        replayed = 0
+        try:
+            f = await asyncio.to_thread(self.spool.open_replay)
+            if f is None:
+                return
+            try:
+                while docs := await asyncio.to_thread(self.spool.read_batch, f, self.batch_size):
+                    await self._insert(docs)
+                    replayed += len(docs)
+            finally:
+                f.close()
+        except Exception as e:
+            # Файл відтворення лишається; наступна спроба почне його спочатку (дублікати _id ігноруються)
+            self.breaker.record_failure()
+            print(f"Activity log spool replay failed, will retry later: {e!r}")
+            return
+        await asyncio.to_thread(self.spool.commit)
+        self.breaker.record_success()
+        self.replayed += replayed
+
+    async def _run(self):
+        while not self._stopping:
+            batch = await self._collect_batch()
+            if batch:
+                await self._flush(batch)
+            elif self.spool.has_data() and self.breaker.allow_request():
+                # Подій немає, але є відкладені — пробуємо відтворити, щойно ланцюг дозволяє
+                await self._replay_spool()
+        # Дренаж при зупинці
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+
+
+activity_log_writer = ActivityLogWriter()
+
+
+def log_activity(log_data: ActivityLogBase) -> bool:
+    """Fire-and-forget запис події: для викликів із обробників запитів."""
+    return activity_log_writer.enqueue(log_data)
+
+
 async def add_activity_log(log_data: ActivityLogBase) -> dict:
+    # Синхронний (awaited) запис одного документа; insert_one сам додає _id у log_dict,
+    # тому окремий find_one для читання назад не потрібен
     log_dict = log_data.model_dump(by_alias=True)
-    result = await activity_log_collection.insert_one(log_dict)
-    # Повертаємо вставлений документ (можливо, з _id)
-    # find_one поверне None, якщо нічого не знайдено
-    created_log = await activity_log_collection.find_one({"_id": result.inserted_id})
-    return created_log
+    await get_activity_log_collection().insert_one(log_dict)
+    return log_dict
 
 async def get_activity_logs(limit: int = 100) -> List[dict]:
-    logs = await activity_log_collection.find().sort("timestamp", -1).limit(limit).to_list(length=limit)
-    return logs
\ No newline at end of file
+    logs = await get_activity_log_collection().find().sort("timestamp", -1).limit(limit).to_list(length=limit)
+    return logs
@@ -1,21 +1,44 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from .metrics import MongoCommandMetrics
 
 load_dotenv()
 
 MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017")
 MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "mydatabase")
+# За замовчуванням Motor чекає на сервер 30 с; для логів активності це занадто довго
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
+# Клієнт створюється при першому зверненні: розбір URI (для mongodb+srv — ще й DNS-запити)
+# і фонові потоки моніторингу не потрібні процесам, які лише імпортують застосунок
+_client = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_DETAILS, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                     event_listeners=[MongoCommandMetrics()])
+    return _client
+
+
+def get_database():
+    return get_client()[MONGO_DATABASE_NAME]
 
-client = AsyncIOMotorClient(MONGO_DETAILS)
-database = client[MONGO_DATABASE_NAME]
 
 # Функція для отримання колекції
 def get_collection(collection_name: str):
-    return database[collection_name]
+    return get_database()[collection_name]
+
 
 # Приклад: колекція для логів
-activity_log_collection = get_collection("activity_logs")
+def get_activity_log_collection():
+    return get_collection("activity_logs")
+
 
 async def close_mongo_connection():
-    client.close()
\ No newline at end of file
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
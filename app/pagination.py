@@ -0,0 +1,95 @@
+# Keyset (cursor) пагінація: замість OFFSET фільтруємо за (timestamp, id) останнього показаного рядка,
+# тому будь-яка сторінка коштує стільки ж, скільки перша.
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from sqlalchemy import and_, or_, literal, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT = "n"
+PREV = "p"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(direction: str, sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([direction, sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid pagination cursor")
+
+
+def bind_datetime(db: AsyncSession, value: datetime):
+    # SQLite порівнює дати як рядки. SQLAlchemy записує їх завжди як "YYYY-MM-DD HH:MM:SS.ffffff"
+    # (і ".000000" для цілих секунд), тому межа має бути рівно в цьому форматі — інакше рівність не
+    # спрацює, і рядки з однаковим часом пропускаються. Старі значення з CURRENT_TIMESTAMP без
+    # мікросекунд приводить до цього формату міграція 0009.
+    if db.get_bind().dialect.name == "sqlite":
+        if value.tzinfo is not None:  # У SQLite дати записані в UTC без зсуву
+            value = value.astimezone(timezone.utc)
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S.%f"), String)
+    return value
+
+
+async def keyset_page(db: AsyncSession, query, sort_column, id_column, cursor: Optional[str] = None,
+                      limit: int = 20, scalars: bool = True) -> Page:
+    """Виконує query (без order_by/limit), впорядковуючи за (sort_column, id_column) DESC.
+    scalars=False — для вибірок окремих колонок: елементи сторінки тоді рядки (Row), а не ORM-об'єкти."""
+    direction = NEXT
+    if cursor:
+        direction, sort_value, row_id = decode_cursor(cursor)
+        bound = bind_datetime(db, sort_value)
+        if direction == NEXT:
+            query = query.filter(or_(sort_column < bound, and_(sort_column == bound, id_column < row_id)))
+        else:
+            query = query.filter(or_(sort_column > bound, and_(sort_column == bound, id_column > row_id)))
+
+    if direction == NEXT:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Беремо на один рядок більше, щоб дізнатись, чи є ще сторінка в цьому напрямку
+    result = await db.execute(query.limit(limit + 1))
+    rows = list(result.unique().scalars().all()) if scalars else list(result.all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+
+    page = Page(items=rows)
+    if not rows:
+        return page
+
+    sort_key = sort_column.key
+    first, last = rows[0], rows[-1]
+    if direction == NEXT:
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+    if has_next:
+        page.next_cursor = encode_cursor(NEXT, getattr(last, sort_key), last.id)
+    if has_prev:
+        page.prev_cursor = encode_cursor(PREV, getattr(first, sort_key), first.id)
+    return page
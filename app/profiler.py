@@ -0,0 +1,278 @@
+# Профайлер SQL на рівні запиту (вмикається адміном заголовком X-Profile: 1 або cookie profile=1)
+# і серверний журнал повільних запитів з планом EXPLAIN.
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+
+from .user_cache import TTLCache
+
+# Поріг для журналу повільних запитів; 0 вимикає журнал
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "slow_queries.jsonl")
+# Параметри можуть містити персональні дані й хеші паролів, тому в журнал за замовчуванням не пишуться
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Один і той самий запит пояснюємо не частіше ніж раз на цей інтервал
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 60))
+# Скільки однакових за формою запитів у межах одного HTTP-запиту вважати підозрою на N+1
+PROFILER_N_PLUS_ONE_THRESHOLD = int(os.getenv("PROFILER_N_PLUS_ONE_THRESHOLD", 3))
+PROFILER_STORE_SIZE = int(os.getenv("PROFILER_STORE_SIZE", 200))
+PROFILER_STORE_TTL_SECONDS = float(os.getenv("PROFILER_STORE_TTL_SECONDS", 600))
+PROFILER_PARAMS_MAX_LENGTH = 500
+
+PROFILER_HEADER = b"x-profile"
+PROFILER_COOKIE = "profile"
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+# Списки плейсхолдерів "(?, ?, ?)" / "($1, $2)" від IN (...) зводимо до одного, щоб форма не залежала від їх кількості
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+profiles = TTLCache(PROFILER_STORE_SIZE, PROFILER_STORE_TTL_SECONDS)
+_recently_explained = TTLCache(1000, SLOW_QUERY_EXPLAIN_INTERVAL)
+_background_tasks = set()
+
+
+def statement_shape(statement: str) -> str:
+    return _WHITESPACE.sub(" ", _PLACEHOLDER_LIST.sub("(?)", statement)).strip()
+
+
+def _app_frame(frame) -> Optional[str]:
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def call_site() -> Optional[str]:
+    """Перший кадр стеку з пакета app (зазвичай функція в crud.py), що виконала інструкцію."""
+    site = _app_frame(sys._getframe(1))
+    if site is None:
+        # Async-сесія виконує SQL у дочірньому greenlet; код застосунку — у стеку батьківського
+        parent = greenlet.getcurrent().parent
+        if parent is not None:
+            site = _app_frame(parent.gr_frame)
+    return site
+
+
+def _format_params(parameters, executemany: bool):
+    if executemany:
+        text = f"{len(parameters)} rows, first: {parameters[0]!r}" if parameters else "[]"
+    else:
+        text = repr(parameters)
+    if len(text) > PROFILER_PARAMS_MAX_LENGTH:
+        text = text[:PROFILER_PARAMS_MAX_LENGTH] + "..."
+    return text
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.statements = []
+        self.db_ms = 0.0
+        self.total_ms = None
+
+    def add(self, statement: str, parameters, executemany: bool, duration_ms: float):
+        self.db_ms += duration_ms
+        self.statements.append({
+            "sql": statement,
+            "params": _format_params(parameters, executemany),
+            "duration_ms": round(duration_ms, 3),
+            "call_site": call_site(),
+        })
+
+    def suspected_n_plus_one(self) -> list:
+        groups = defaultdict(list)
+        for item in self.statements:
+            groups[statement_shape(item["sql"])].append(item)
+        return [
+            {
+                "sql": shape,
+                "count": len(items),
+                "total_ms": round(sum(item["duration_ms"] for item in items), 3),
+                "call_sites": sorted({item["call_site"] for item in items if item["call_site"]}),
+            }
+            for shape, items in groups.items() if len(items) >= PROFILER_N_PLUS_ONE_THRESHOLD
+        ]
+
+    def report(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": self.total_ms,
+            "db_ms": round(self.db_ms, 3),
+            "query_count": len(self.statements),
+            "suspected_n_plus_one": self.suspected_n_plus_one(),
+            "statements": self.statements,
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+# --- Журнал повільних запитів ---
+
+def _write_slow_query(entry: dict):
+    try:
+        with open(SLOW_QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        print(f"Could not write slow query log: {e}")
+
+
+async def _explain(engine: AsyncEngine, statement: str, parameters) -> list:
+    async with engine.connect() as conn:
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        result = await conn.exec_driver_sql(prefix + statement, parameters)
+        # PostgreSQL повертає план рядками в одній колонці, SQLite — detail в останній
+        return [str(row[-1]) for row in result.all()]
+
+
+async def _explain_and_write(entry: dict, engine: AsyncEngine, statement: str, parameters):
+    try:
+        entry["plan"] = await _explain(engine, statement, parameters)
+    except Exception as e:
+        entry["plan_error"] = repr(e)
+    await asyncio.to_thread(_write_slow_query, entry)
+
+
+def _log_slow_query(engine, statement: str, parameters, executemany: bool, duration_ms: float):
+    """engine — sync Engine, що виконав інструкцію: EXPLAIN має йти в ту саму базу (primary чи репліку)."""
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms, 3),
+        "sql": statement,
+        "call_site": call_site(),
+    }
+    if SLOW_QUERY_LOG_PARAMS:
+        entry["params"] = _format_params(parameters, executemany)
+    shape = statement_shape(statement)
+    operation = statement.lstrip()[:6].upper()
+    can_explain = (SLOW_QUERY_EXPLAIN and engine.dialect.is_async and operation.startswith(_EXPLAINABLE)
+                   and _recently_explained.get(shape) is None)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is None:
+        _write_slow_query(entry)
+        return
+    if can_explain:
+        _recently_explained.set(shape, True)
+        # EXPLAIN — окремим з'єднанням після завершення поточної інструкції, не блокуючи запит
+        params = parameters[0] if executemany and parameters else parameters
+        task = loop.create_task(_explain_and_write(entry, AsyncEngine(engine), statement, params))
+    else:
+        task = loop.create_task(asyncio.to_thread(_write_slow_query, entry))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+# --- Події SQLAlchemy ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profiler_start", None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add(statement, parameters, executemany, duration_ms)
+    if 0 < SLOW_QUERY_THRESHOLD_MS <= duration_ms and not statement.lstrip().upper().startswith("EXPLAIN"):
+        _log_slow_query(conn.engine, statement, parameters, executemany, duration_ms)
+
+
+def instrument_engine(engine):
+    """Підключає профайлер і журнал повільних запитів до async engine. Повторний виклик нічого не робить."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Middleware ---
+
+def _profiling_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILER_HEADER and value in (b"1", b"true"):
+            return True
+        if name == b"cookie" and PROFILER_COOKIE.encode() + b"=" in value:
+            return Request(scope).cookies.get(PROFILER_COOKIE) in ("1", "true")
+    return False
+
+
+async def _is_admin(scope) -> bool:
+    from . import auth
+    from .database import SessionLocal
+
+    request = Request(scope)
+    token = request.cookies.get("access_token")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        return False
+    # Знімок користувача зазвичай уже в кеші, тож сесія не торкається БД
+    async with SessionLocal() as db:
+        user = await auth.get_user_by_token(token, db)
+    return user is not None and user.is_active and user.role == "admin"
+
+
+class ProfilerMiddleware:
+    """Для адмінів із X-Profile: 1 (або cookie profile=1) записує всі SQL-інструкції запиту.
+    Зведення — у заголовках відповіді, повний звіт — GET /admin/profiles/{X-Profile-Id}."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope) or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                headers.append((b"server-timing",
+                                f'db;dur={profile.db_ms:.3f};desc="{len(profile.statements)} queries"'.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            profile.total_ms = round((time.perf_counter() - start) * 1000, 3)
+            profiles.set(profile.id, profile.report())
@@ -0,0 +1,280 @@
+# Живий прогрес зборів через Server-Sent Events. Один broadcaster на воркер: crud.create_donation
+# лише додає дельту, а фонова задача раз на SSE_PUBLISH_INTERVAL розсилає зведені зміни всім підписникам.
+# Тож тисячі глядачів коштують одного продюсера й одного запиту до БД на ресинхронізацію, а не тисяч опитувань.
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Dict, Optional, Set
+
+from . import metrics
+
+SSE_PUBLISH_INTERVAL = float(os.getenv("SSE_PUBLISH_INTERVAL", 1.0))
+# Раз на цей інтервал суми спостережуваних проєктів звіряються з БД (пожертви через інші воркери, імпорт тощо)
+SSE_RESYNC_INTERVAL = float(os.getenv("SSE_RESYNC_INTERVAL", 10.0))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15.0))
+# Підписник, у якого накопичилось стільки непрочитаних подій, вважається повільним і від'єднується
+SSE_CLIENT_QUEUE_SIZE = int(os.getenv("SSE_CLIENT_QUEUE_SIZE", 64))
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", 20000))
+
+ALL_PROJECTS = None  # Ключ підписки на всі активні проєкти
+
+
+def format_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+HEARTBEAT = b": ping\n\n"
+
+
+class Subscription:
+    """Черга одного глядача. Легша за asyncio.Queue (deque і один future очікування),
+    бо таких об'єктів на воркер можуть бути десятки тисяч."""
+    __slots__ = ("project_id", "max_queue", "messages", "waiter", "dropped")
+
+    def __init__(self, project_id: Optional[int], max_queue: int):
+        self.project_id = project_id
+        self.max_queue = max_queue
+        self.messages = deque()
+        self.waiter: Optional[asyncio.Future] = None
+        self.dropped = False
+
+    def put(self, message: bytes) -> bool:
+        """False — черга переповнена (клієнт не встигає читати)."""
+        if len(self.messages) >= self.max_queue:
+            return False
+        self.messages.append(message)
+        self._wake()
+        return True
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self, timeout: float) -> Optional[bytes]:
+        """Наступна подія; None — якщо за timeout нічого не надійшло або підписку закрито."""
+        if not self.messages and not self.dropped:
+            loop = asyncio.get_running_loop()
+            self.waiter = loop.create_future()
+            # Таймер, що просто будить очікування, дешевший за asyncio.wait_for (без проміжних future й задач)
+            timer = loop.call_later(timeout, self._wake)
+            try:
+                await self.waiter
+            finally:
+                timer.cancel()
+                self.waiter = None
+        if self.dropped or not self.messages:
+            return None
+        return self.messages.popleft()
+
+    def close(self):
+        self.dropped = True
+        # Непрочитані події звільняємо одразу, а не коли клієнт нарешті їх дочитає
+        self.messages.clear()
+        self._wake()
+
+
+class ProgressBroadcaster:
+    def __init__(self, publish_interval: float = SSE_PUBLISH_INTERVAL, resync_interval: float = SSE_RESYNC_INTERVAL,
+                 max_queue: int = SSE_CLIENT_QUEUE_SIZE, max_subscribers: int = SSE_MAX_SUBSCRIBERS):
+        self.publish_interval = publish_interval
+        self.resync_interval = resync_interval
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        # project_id (або ALL_PROJECTS) -> підписники
+        self._subscribers: Dict[Optional[int], Set[Subscription]] = {}
+        # Відомий стан спостережуваних проєктів: project_id -> (current_amount, target_amount)
+        self._state: Dict[int, tuple] = {}
+        self._all_loaded = False
+        # Завантаження стану, що вже виконуються: project_id (або ALL_PROJECTS) -> задача _load
+        self._loading: Dict[Optional[int], asyncio.Task] = {}
+        self._pending: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                self._drop(sub)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "watched_projects": len(self._state),
+            "events_sent": metrics.sse_events_total.value(),
+            "dropped": metrics.sse_dropped_subscribers_total.value(),
+            "resyncs": metrics.sse_resyncs_total.value(),
+        }
+
+    def publish(self, project_id: int, delta: float):
+        """Викликається після commit пожертви. Нічого не робить, якщо за проєктом ніхто не стежить."""
+        if project_id in self._state:
+            self._pending[project_id] = self._pending.get(project_id, 0.0) + delta
+
+    async def subscribe(self, project_id: Optional[int]) -> Optional[Subscription]:
+        """Реєструє глядача і кладе в його чергу поточний стан. None — проєкту немає або він неактивний."""
+        if self.subscriber_count >= self.max_subscribers:
+            raise OverflowError("Too many live progress subscribers")
+        if project_id is ALL_PROJECTS:
+            if not self._all_loaded:
+                await self._load_once(ALL_PROJECTS)
+            snapshot = format_event("snapshot", [self._progress(pid, 0.0) for pid in self._state])
+        else:
+            if project_id not in self._state:
+                await self._load_once(project_id)
+            if project_id not in self._state:
+                return None
+            snapshot = format_event("progress", self._progress(project_id, 0.0))
+        sub = Subscription(project_id, self.max_queue)
+        sub.put(snapshot)
+        self._subscribers.setdefault(project_id, set()).add(sub)
+        metrics.sse_subscribers.inc()
+        return sub
+
+    def _remove(self, sub: Subscription):
+        subs = self._subscribers.get(sub.project_id)
+        if subs is not None and sub in subs:
+            subs.discard(sub)
+            metrics.sse_subscribers.dec()
+            if not subs:
+                del self._subscribers[sub.project_id]
+
+    def unsubscribe(self, sub: Subscription):
+        self._remove(sub)
+        if ALL_PROJECTS in self._subscribers:
+            return
+        self._all_loaded = False
+        # Проєкти, за якими більше ніхто не стежить, перестаємо відстежувати
+        for project_id in [pid for pid in self._state if pid not in self._subscribers]:
+            self._state.pop(project_id, None)
+            self._pending.pop(project_id, None)
+
+    async def events(self, sub: Subscription):
+        """Генератор тіла відповіді text/event-stream для одного глядача."""
+        try:
+            while True:
+                message = await sub.get(SSE_HEARTBEAT_SECONDS)
+                if sub.dropped:
+                    break
+                yield message if message is not None else HEARTBEAT
+        finally:
+            self.unsubscribe(sub)
+
+    def _progress(self, project_id: int, delta: float) -> dict:
+        current_amount, target_amount = self._state[project_id]
+        return {"project_id": project_id, "current_amount": current_amount, "target_amount": target_amount,
+                "delta": delta}
+
+    def _drop(self, sub: Subscription):
+        sub.close()
+        self._remove(sub)
+
+    def _send(self, project_id: int, message: bytes):
+        sent = 0
+        for key in (project_id, ALL_PROJECTS):
+            for sub in list(self._subscribers.get(key, ())):
+                if sub.put(message):
+                    sent += 1
+                else:
+                    # Повільний клієнт не повинен накопичувати пам'ять і гальмувати решту
+                    metrics.sse_dropped_subscribers_total.inc()
+                    self._drop(sub)
+        metrics.sse_events_total.inc(amount=sent)
+
+    async def _load_once(self, project_id: Optional[int]):
+        """Один запит до БД на проєкт, скільки б глядачів не відкрили його одночасно: решта чекають
+        на те саме завантаження. shield — від'єднання першого глядача не скасовує запит для інших."""
+        task = self._loading.get(project_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(None if project_id is ALL_PROJECTS else [project_id]))
+            self._loading[project_id] = task
+            task.add_done_callback(lambda done: self._loading_done(project_id, done))
+        await asyncio.shield(task)
+
+    def _loading_done(self, project_id: Optional[int], task: asyncio.Task):
+        if self._loading.get(project_id) is task:
+            del self._loading[project_id]
+        if not task.cancelled():
+            task.exception()  # Помилку отримують глядачі; якщо всі вже від'єднались — без "never retrieved"
+
+    async def _load(self, project_ids) -> list:
+        # crud імпортує цей модуль (publish), тому імпорт тут, а не на рівні модуля
+        from . import crud
+        from .database import ReadSessionLocal
+        # Лише читання, тож репліка (якщо є); її відставання виправить наступна ресинхронізація
+        async with ReadSessionLocal() as db:
+            rows = await crud.get_project_progress(db, project_ids=project_ids)
+        changed = self._merge({row.id: (row.current_amount, row.target_amount) for row in rows}, project_ids)
+        if project_ids is None:
+            self._all_loaded = True
+        return changed
+
+    def _merge(self, loaded: dict, project_ids) -> list:
+        """Оновлює відомий стан з БД і повертає дельти для проєктів, сума яких змінилась."""
+        changed = []
+        expected = set(self._state) if project_ids is None else set(project_ids)
+        for project_id in expected - set(loaded):
+            # Проєкт видалено або деактивовано — глядачі окремого проєкту нових подій не отримають
+            self._state.pop(project_id, None)
+        for project_id, (current_amount, target_amount) in loaded.items():
+            previous = self._state.get(project_id)
+            self._state[project_id] = (current_amount, target_amount)
+            if previous is not None and previous[0] != current_amount:
+                changed.append((project_id, current_amount - previous[0]))
+        return changed
+
+    async def _resync(self):
+        if not self._subscribers:
+            return
+        watched = [project_id for project_id in self._subscribers if project_id is not ALL_PROJECTS]
+        changed = await self._load(None if self._all_loaded else watched)
+        metrics.sse_resyncs_total.inc()
+        for project_id, delta in changed:
+            # Свіжа сума з БД вже врахувала пожертви; якщо локальна дельта ще не увійшла в неї,
+            # розбіжність виправить наступна ресинхронізація
+            self._pending.pop(project_id, None)
+            self._send(project_id, format_event("progress", self._progress(project_id, delta)))
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        for project_id, delta in pending.items():
+            if project_id not in self._state:
+                continue
+            current_amount, target_amount = self._state[project_id]
+            self._state[project_id] = (current_amount + delta, target_amount)
+            # Подія серіалізується один раз для всіх підписників
+            self._send(project_id, format_event("progress", self._progress(project_id, delta)))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time() + self.resync_interval
+        while not self._stopping:
+            await asyncio.sleep(self.publish_interval)
+            self._flush()
+            if loop.time() >= next_resync:
+                next_resync = loop.time() + self.resync_interval
+                try:
+                    await self._resync()
+                except Exception as e:
+                    print(f"Live progress resync failed: {e!r}")
+
+
+progress_broadcaster = ProgressBroadcaster()
+
+
+def publish_donation(project_id: int, amount: float):
+    progress_broadcaster.publish(project_id, amount)
@@ -0,0 +1,38 @@
+# Лічильник SQL-запитів: допомагає ловити N+1 при рендері сторінок
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """Рахує всі SQL-інструкції, виконані через engine (sync або async) всередині блоку with."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    counter = QueryCounter()
+    event.listen(sync_engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", counter._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(engine, expected: int):
+    """Падає з AssertionError, якщо в блоці виконано більше ніж expected запитів."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > expected:
+        details = "\n".join(counter.statements)
+        raise AssertionError(f"Expected at most {expected} SQL statements, got {counter.count}:\n{details}")
@@ -0,0 +1,150 @@
+# Обмеження частоти спроб входу (/auth/login, /auth/token) алгоритмом token bucket — окремо по IP і по імені.
+# Перевірка йде першою в обробнику: відхилена спроба не робить ні запиту до БД, ні bcrypt.
+# LOGIN_RATE_LIMIT_BACKEND=db додатково ділить ліміт між воркерами через таблицю rate_limit_buckets.
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import delete, func
+
+from . import metrics, models
+from .database import dialect_insert
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# memory — ліміт на кожен воркер; db — спільний для всіх воркерів (SQLite/PostgreSQL)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+# Ємність відра (скільки спроб підряд) і швидкість поповнення (спроб за хвилину)
+LOGIN_RATE_LIMIT_IP_BURST = int(os.getenv("LOGIN_RATE_LIMIT_IP_BURST", 20))
+LOGIN_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_IP_PER_MINUTE", 10))
+LOGIN_RATE_LIMIT_USERNAME_BURST = int(os.getenv("LOGIN_RATE_LIMIT_USERNAME_BURST", 5))
+LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE", 5))
+# Скільки відер тримати в пам'яті; найдавніше використані витісняються
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", 100000))
+LOGIN_RATE_LIMIT_SWEEP_INTERVAL = float(os.getenv("LOGIN_RATE_LIMIT_SWEEP_INTERVAL", 600))
+
+buckets = models.RateLimitBucket.__table__
+
+
+class TokenBucketLimiter:
+    def __init__(self, name: str, capacity: int, per_minute: float, max_keys: int = LOGIN_RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.capacity = capacity
+        self.rate = per_minute / 60.0  # Токенів за секунду
+        self.max_keys = max_keys
+        # key -> [токени, час останнього оновлення (monotonic)]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Забирає токен. 0 — спробу дозволено, інакше через скільки секунд з'явиться наступний токен."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.capacity), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def drain(self, key: str):
+        """Спільний ліміт вичерпано — відхиляємо локально, доки не з'явиться токен, без повторних запитів до БД."""
+        self._buckets[key] = [0.0, time.monotonic()]
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def take_shared(self, db, key: str) -> bool:
+        """Атомарно забирає токен зі спільного відра в БД одним INSERT ... ON CONFLICT DO UPDATE ... WHERE."""
+        now = time.time()  # Спільне відро — час має бути однаковим для всіх процесів
+        least = func.least if db.get_bind().dialect.name == "postgresql" else func.min
+        refilled = least(self.capacity, buckets.c.tokens + (now - buckets.c.updated_at) * self.rate)
+        stmt = dialect_insert(db)(buckets).values(key=f"{self.name}:{key}", tokens=self.capacity - 1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(index_elements=[buckets.c.key],
+                                          set_={"tokens": refilled - 1, "updated_at": now}, where=refilled >= 1)
+        # Якщо токенів немає, WHERE не пропускає оновлення — rowcount 0
+        return (await db.execute(stmt)).rowcount == 1
+
+
+ip_limiter = TokenBucketLimiter("ip", LOGIN_RATE_LIMIT_IP_BURST, LOGIN_RATE_LIMIT_IP_PER_MINUTE)
+username_limiter = TokenBucketLimiter("username", LOGIN_RATE_LIMIT_USERNAME_BURST,
+                                      LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE)
+
+
+def client_ip(request: Request) -> str:
+    # За проксі запускайте uvicorn з --proxy-headers, тоді тут буде адреса клієнта з X-Forwarded-For
+    return request.client.host if request.client else "unknown"
+
+
+def retry_after_header(retry_after: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+async def _take_shared(checks) -> float:
+    from .database import SessionLocal
+    try:
+        async with SessionLocal() as db:
+            if dialect_insert(db) is None:
+                return 0.0
+            for limiter, key in checks:
+                if not await limiter.take_shared(db, key):
+                    await db.commit()
+                    limiter.drain(key)
+                    metrics.login_rate_limit_total.inc(limiter.name, "rejected")
+                    return 1 / limiter.rate
+            await db.commit()
+    except Exception as e:
+        # Недоступна БД не повинна блокувати вхід через ліміт (локальний ліміт діє й далі)
+        print(f"Shared login rate limit check failed: {e!r}")
+    return 0.0
+
+
+async def check_login(request: Request, username: Optional[str]) -> Optional[float]:
+    """None — спробу дозволено; інакше кількість секунд для Retry-After."""
+    if not LOGIN_RATE_LIMIT_ENABLED:
+        return None
+    checks = [(ip_limiter, client_ip(request))]
+    if username:
+        checks.append((username_limiter, username.strip().lower()))
+    for limiter, key in checks:
+        retry_after = limiter.take(key)
+        if retry_after:
+            metrics.login_rate_limit_total.inc(limiter.name, "rejected")
+            return retry_after
+    if LOGIN_RATE_LIMIT_BACKEND == "db":
+        retry_after = await _take_shared(checks)
+        if retry_after:
+            return retry_after
+    for limiter, _ in checks:
+        metrics.login_rate_limit_total.inc(limiter.name, "allowed")
+    return None
+
+
+async def sweep_buckets(db) -> int:
+    """Видаляє спільні відра, що вже повністю поповнились (вони рівнозначні відсутнім)."""
+    full_after = max(limiter.capacity / limiter.rate for limiter in (ip_limiter, username_limiter))
+    result = await db.execute(delete(buckets).where(buckets.c.updated_at < time.time() - full_after))
+    await db.commit()
+    return result.rowcount
+
+
+async def run_sweeper():
+    from .database import SessionLocal
+    while True:
+        await asyncio.sleep(LOGIN_RATE_LIMIT_SWEEP_INTERVAL)
+        try:
+            async with SessionLocal() as db:
+                await sweep_buckets(db)
+        except Exception as e:
+            print(f"Login rate limit sweep failed: {e!r}")
@@ -0,0 +1,192 @@
+# Денні агрегати пожертв (сума, кількість, унікальні донори по проєкту за день).
+# Оновлюються інкрементально в тій самій транзакції, що й пожертви; повний перерахунок:
+#   python -m app.rollups
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update, delete, insert, func, distinct, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .database import dialect_insert
+
+REBUILD_BATCH_PROJECTS = 100
+
+rollups = models.DonationDailyRollup.__table__
+donors = models.DonationDailyDonor.__table__
+
+
+def to_utc(donation_date: datetime) -> datetime:
+    """Дата пожертви в UTC (без часового поясу вважається UTC). Записувати в БД лише так:
+    SQLite зберігає datetime без зміщення, і date(donation_date) у SQL дає той самий день, що й donation_day."""
+    if donation_date.tzinfo is None:
+        return donation_date.replace(tzinfo=timezone.utc)
+    return donation_date.astimezone(timezone.utc)
+
+
+def donation_day(donation_date: Optional[datetime]) -> date:
+    """День (UTC), до якого відноситься пожертва; без дати — сьогодні, як у server_default."""
+    if donation_date is None:
+        return datetime.now(timezone.utc).date()
+    return to_utc(donation_date).date()
+
+
+async def _upsert_rollups(db: AsyncSession, params: list):
+    insert_stmt = dialect_insert(db)
+    if insert_stmt is None:
+        # Діалект без ON CONFLICT: UPDATE, а якщо рядка ще немає — INSERT
+        for row in params:
+            result = await db.execute(
+                update(rollups).where(rollups.c.project_id == row["project_id"], rollups.c.day == row["day"])
+                .values(total_amount=rollups.c.total_amount + row["total_amount"],
+                        donation_count=rollups.c.donation_count + row["donation_count"],
+                        unique_donors=rollups.c.unique_donors + row["unique_donors"])
+            )
+            if result.rowcount == 0:
+                await db.execute(insert(rollups).values(**row))
+        return
+    stmt = insert_stmt(rollups)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[rollups.c.project_id, rollups.c.day],
+        set_={
+            "total_amount": rollups.c.total_amount + stmt.excluded.total_amount,
+            "donation_count": rollups.c.donation_count + stmt.excluded.donation_count,
+            "unique_donors": rollups.c.unique_donors + stmt.excluded.unique_donors,
+        },
+    )
+    await db.execute(stmt, params)
+
+
+async def apply_donations(db: AsyncSession, donations: Iterable[dict]):
+    """Додає пожертви (dict з project_id, user_id, amount, donation_date) до агрегатів.
+    Не робить commit — викликається всередині транзакції, що вставляє пожертви."""
+    groups = defaultdict(lambda: {"total_amount": 0.0, "donation_count": 0, "users": set()})
+    for donation in donations:
+        group = groups[(donation["project_id"], donation_day(donation.get("donation_date")))]
+        group["total_amount"] += donation["amount"]
+        group["donation_count"] += 1
+        if donation.get("user_id") is not None:
+            group["users"].add(donation["user_id"])
+    if not groups:
+        return
+
+    # Нові за день донори = ті, кого ще немає в donation_daily_donors
+    all_users = set().union(*(group["users"] for group in groups.values()))
+    existing = set()
+    if all_users:
+        result = await db.execute(
+            select(donors.c.project_id, donors.c.day, donors.c.user_id)
+            .where(donors.c.project_id.in_({key[0] for key in groups}),
+                   donors.c.day.in_({key[1] for key in groups}),
+                   donors.c.user_id.in_(all_users))
+        )
+        existing = set(result.all())
+
+    new_donors = []
+    params = []
+    for (project_id, day), group in groups.items():
+        fresh = [user_id for user_id in group["users"] if (project_id, day, user_id) not in existing]
+        new_donors.extend({"project_id": project_id, "day": day, "user_id": user_id} for user_id in fresh)
+        params.append({"project_id": project_id, "day": day, "total_amount": group["total_amount"],
+                       "donation_count": group["donation_count"], "unique_donors": len(fresh)})
+    if new_donors:
+        insert_stmt = dialect_insert(db)
+        stmt = insert(donors) if insert_stmt is None else insert_stmt(donors).on_conflict_do_nothing()
+        await db.execute(stmt, new_donors)
+    await _upsert_rollups(db, params)
+
+
+async def apply_donation(db: AsyncSession, project_id: int, user_id: Optional[int], amount: float,
+                         donation_date: Optional[datetime] = None):
+    insert_stmt = dialect_insert(db)
+    if insert_stmt is None:
+        await apply_donations(db, [{"project_id": project_id, "user_id": user_id, "amount": amount,
+                                    "donation_date": donation_date}])
+        return
+    day = donation_day(donation_date)
+    new_donor = 0
+    if user_id is not None:
+        # Один запит замість SELECT + INSERT і без гонки між паралельними пожертвами одного донора
+        result = await db.execute(
+            insert_stmt(donors).values(project_id=project_id, day=day, user_id=user_id).on_conflict_do_nothing()
+        )
+        new_donor = result.rowcount
+    await _upsert_rollups(db, [{"project_id": project_id, "day": day, "total_amount": amount,
+                                "donation_count": 1, "unique_donors": new_donor}])
+
+
+# --- Читання для дашборду / API: лише таблиця агрегатів, розмір donations не впливає ---
+
+async def get_project_totals(db: AsyncSession):
+    result = await db.execute(
+        select(models.Project.id, models.Project.name,
+               func.coalesce(func.sum(rollups.c.total_amount), 0.0).label("total_amount"),
+               func.coalesce(func.sum(rollups.c.donation_count), 0).label("donation_count"))
+        .outerjoin(rollups, rollups.c.project_id == models.Project.id)
+        .group_by(models.Project.id, models.Project.name)
+        .order_by(literal_column("total_amount").desc())
+    )
+    return result.all()
+
+
+async def get_daily_totals(db: AsyncSession, days: int = 30, project_id: Optional[int] = None):
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    if project_id is not None:
+        query = select(rollups.c.day, rollups.c.total_amount, rollups.c.donation_count, rollups.c.unique_donors) \
+            .where(rollups.c.project_id == project_id)
+    else:
+        # Унікальні донори по всіх проєктах зі зведених по проєктах даних не виводяться — лише суми
+        query = select(rollups.c.day, func.sum(rollups.c.total_amount).label("total_amount"),
+                       func.sum(rollups.c.donation_count).label("donation_count")) \
+            .group_by(rollups.c.day)
+    result = await db.execute(query.where(rollups.c.day >= since).order_by(rollups.c.day.desc()))
+    return result.all()
+
+
+# --- Повний перерахунок ---
+
+def _day_expression(db: AsyncSession):
+    """SQL-відповідник donation_day (так само й у міграції 0008)."""
+    donation_date = models.Donation.donation_date
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", donation_date))
+    # Без timestamptz: значення вже записані в UTC (to_utc; server_default CURRENT_TIMESTAMP — теж UTC)
+    return func.date(donation_date)
+
+
+async def rebuild(db: AsyncSession, batch_projects: int = REBUILD_BATCH_PROJECTS) -> int:
+    """Перераховує агрегати з таблиці donations набором INSERT ... SELECT ... GROUP BY,
+    по batch_projects проєктів за транзакцію. Повертає кількість оброблених проєктів."""
+    project_ids = list((await db.execute(select(models.Project.id).order_by(models.Project.id))).scalars())
+    day = _day_expression(db)
+    for start in range(0, len(project_ids), batch_projects):
+        batch = project_ids[start:start + batch_projects]
+        await db.execute(delete(donors).where(donors.c.project_id.in_(batch)))
+        await db.execute(delete(rollups).where(rollups.c.project_id.in_(batch)))
+        await db.execute(insert(rollups).from_select(
+            ["project_id", "day", "total_amount", "donation_count", "unique_donors"],
+            select(models.Donation.project_id, day, func.sum(models.Donation.amount), func.count(models.Donation.id),
+                   func.count(distinct(models.Donation.user_id)))
+            .where(models.Donation.project_id.in_(batch))
+            .group_by(models.Donation.project_id, day)
+        ))
+        await db.execute(insert(donors).from_select(
+            ["project_id", "day", "user_id"],
+            select(models.Donation.project_id, day, models.Donation.user_id).distinct()
+            .where(models.Donation.project_id.in_(batch), models.Donation.user_id.isnot(None))
+        ))
+        await db.commit()
+    return len(project_ids)
+
+
+async def _main():
+    from .database import SessionLocal
+    async with SessionLocal() as db:
+        count = await rebuild(db)
+    print(f"Donation rollups rebuilt for {count} projects")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
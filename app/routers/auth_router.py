@@ -1,19 +1,18 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from fastapi.templating import Jinja2Templates
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import timedelta
 from pydantic import BaseModel, EmailStr
-from app import crud, schemas, auth, models
+from app import crud, schemas, auth, models, rate_limit, views
+from app.templating import templates
 from app.database import get_db
 from app.dependencies import get_current_user_optional, get_current_user
-from app.mongo_crud import add_activity_log # Імпортуємо функцію
+from app.mongo_crud import log_activity # Імпортуємо функцію
 from app.schemas import ActivityLogBase # Імпортуємо схему
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/register", response_class=HTMLResponse)
@@ -29,9 +28,11 @@ async def handle_registration(
         email: EmailStr = Form(...),
         password: str = Form(...),
         full_name: str = Form(...),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    user = crud.get_user_by_email(db, email=email)
+    user = await crud.get_user_by_email(db, email=email)
+    # Хешування пароля триває сотні мілісекунд — з'єднання на цей час повертаємо в пул
+    await views.release(db)
     if user:
         return templates.TemplateResponse("register.html", {
             "request": request,
@@ -40,7 +41,7 @@ async def handle_registration(
         })
 
     user_create = schemas.UserCreate(email=email, password=password, full_name=full_name)
-    crud.create_user(db=db, user=user_create)
+    await crud.create_user(db=db, user=user_create)
 
     # Можна одразу логінити або перенаправляти на сторінку логіна з повідомленням
     return RedirectResponse(url="/auth/login?message=Registration successful. Please login.",
@@ -60,10 +61,21 @@ async def handle_login(
         request: Request,
         username: EmailStr = Form(...),  # FastAPI використовує username з OAuth2PasswordRequestForm
         password: str = Form(...),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    user = crud.get_user_by_email(db, email=username)
-    if not user or not auth.verify_password(password, user.hashed_password):
+    # До запиту в БД і bcrypt: підбір паролів не повинен навантажувати процесор
+    retry_after = await rate_limit.check_login(request, username)
+    if retry_after is not None:
+        return templates.TemplateResponse("login.html", {
+            "request": request,
+            "current_user": None,
+            "error": "Too many login attempts. Please try again later."
+        }, status_code=status.HTTP_429_TOO_MANY_REQUESTS, headers=rate_limit.retry_after_header(retry_after))
+
+    user = await crud.get_user_by_email(db, email=username)
+    # Поки bcrypt чекає в черзі пулу, з'єднання не тримаємо: шторм логінів не вичерпує пул для інших сторінок
+    await views.release(db)
+    if not user or not await auth.verify_password_async(password, user.hashed_password):
         return templates.TemplateResponse("login.html", {
             "request": request,
             "current_user": None,
@@ -83,7 +95,7 @@ async def handle_login(
     )
 
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
-    await add_activity_log(ActivityLogBase(user_email=user.email, action="LOGIN_SUCCESS"))
+    log_activity(ActivityLogBase(user_email=user.email, action="LOGIN_SUCCESS"))
     response.set_cookie(key="access_token", value=f"{access_token}", httponly=True, max_age=1800,
                         samesite="Lax")  # max_age в секундах
     return response
@@ -99,11 +111,17 @@ async def logout_user(request: Request, current_user: models.User = Depends(get_
 # API endpoint for token generation (useful for Postman/Swagger or JS clients)
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token_api(
+        request: Request,
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    retry_after = await rate_limit.check_login(request, form_data.username)
+    if retry_after is not None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many login attempts", headers=rate_limit.retry_after_header(retry_after))
+    user = await crud.get_user_by_email(db, email=form_data.username)
+    await views.release(db)  # Як і в handle_login: не тримаємо з'єднання під час bcrypt
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
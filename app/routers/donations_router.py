@@ -1,74 +1,112 @@
-from fastapi import APIRouter, Depends, Request, Form, HTTPException, status, Path
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Request, Response, Form, HTTPException, status, Path, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+from datetime import datetime
+import codecs
+import csv
+import io
+import json
+from pydantic import ValidationError
 
-from app import crud, schemas, models
-from app.database import get_db
+from app import crud, schemas, models, database, views, idempotency
+from app.templating import templates
+from app.database import get_db, get_read_db, stick_to_primary
 from app.dependencies import get_current_user, get_current_admin_user, get_current_user_optional
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+PAGE_SIZE = 50
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+EXPORT_COLUMNS = ["id", "amount", "donation_date", "message", "user_id", "donor_email", "donor_name",
+                  "project_id", "project_name"]
 
 
 @router.get("/make/{project_id}", response_class=HTMLResponse)
 async def make_donation_form_html(
         request: Request,
         project_id: int = Path(..., gt=0),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_user)  # Потрібен залогінений юзер
 ):
-    project = crud.get_project(db, project_id=project_id)
+    project = views.project_view(await crud.get_project(db, project_id=project_id))
     if not project or not project.is_active:
         raise HTTPException(status_code=404, detail="Active project not found")
+    await views.release(db)
 
     return templates.TemplateResponse("make_donation.html", {
         "request": request,
         "project": project,
-        "current_user": current_user
+        "current_user": current_user,
+        # Повторне надсилання цієї форми (подвійний клік, retry) не створить другу пожертву
+        "idempotency_key": idempotency.new_form_key()
     })
 
 
+def _donation_redirect(project_id: int):
+    # Перенаправлення на сторінку проєкту з повідомленням про успішну пожертву
+    # Сторінку проєкту після редіректу читаємо з primary, щоб нова пожертва вже була видна
+    return stick_to_primary(RedirectResponse(url=f"/projects/{project_id}?donation_success=true",
+                                             status_code=status.HTTP_303_SEE_OTHER))
+
+
 @router.post("/make/{project_id}", response_class=HTMLResponse)
 async def handle_make_donation_html(
         request: Request,
         project_id: int = Path(..., gt=0),
         amount: float = Form(...),
         message: Optional[str] = Form(None),
-        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = Form(None),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    project = crud.get_project(db, project_id=project_id)
+    key = idempotency.get_key(request, current_user.id, "donation", idempotency_key)
+    if key is not None and await idempotency.get_resource_id(db, key) is not None:
+        return _donation_redirect(project_id)  # Повтор уже виконаного запиту
+
+    project = await crud.get_project(db, project_id=project_id)
     if not project or not project.is_active:
         raise HTTPException(status_code=404, detail="Active project not found for donation")
 
     if amount <= 0:
+        project = views.project_view(project)
+        await views.release(db)
         return templates.TemplateResponse("make_donation.html", {
             "request": request, "project": project, "current_user": current_user,
+            "idempotency_key": idempotency_key or idempotency.new_form_key(),
             "error": "Donation amount must be positive."
         }, status_code=status.HTTP_400_BAD_REQUEST)
 
     donation_in = schemas.DonationCreate(project_id=project_id, amount=amount, message=message)
-    donation = crud.create_donation(db=db, donation=donation_in, user_id=current_user.id)
+    try:
+        donation = await crud.create_donation(db=db, donation=donation_in, user_id=current_user.id,
+                                              idempotency_key=key)
+    except idempotency.DuplicateRequest:
+        return _donation_redirect(project_id)  # Паралельний дублікат: пожертву вже створив інший запит
 
     if not donation:  # Якщо create_donation повернув None (наприклад, проєкт не знайдено при оновленні)
         raise HTTPException(status_code=500, detail="Could not process donation")
 
-    # Перенаправлення на сторінку проєкту з повідомленням про успішну пожертву
-    return RedirectResponse(url=f"/projects/{project.id}?donation_success=true", status_code=status.HTTP_303_SEE_OTHER)
+    return _donation_redirect(project.id)
 
 
 @router.get("/my", response_class=HTMLResponse)
 async def my_donations_html(
         request: Request,
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    donations = crud.get_donations_by_user(db, user_id=current_user.id)
+    page = await crud.get_donations_by_user_page(db, user_id=current_user.id, cursor=cursor, limit=PAGE_SIZE)
+    donations = views.donation_views(page.items)
+    await views.release(db)
     return templates.TemplateResponse("my_donations.html", {
         "request": request,
         "donations": donations,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
         "current_user": current_user
     })
 
@@ -76,12 +114,177 @@ async def my_donations_html(
 @router.get("/all", response_class=HTMLResponse)  # Тільки для адміна
 async def all_donations_admin_html(
         request: Request,
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
-    donations = crud.get_all_donations(db)
+    page = await crud.get_all_donations_page(db, cursor=cursor, limit=PAGE_SIZE)
+    donations = views.donation_views(page.items)
+    await views.release(db)
     return templates.TemplateResponse("admin/all_donations.html", {
         "request": request,
         "donations": donations,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
         "current_user": current_user
-    })
\ No newline at end of file
+    })
+
+
+async def _export_donations(export_format: str, project_id: Optional[int], date_from: Optional[datetime],
+                            date_to: Optional[datetime]):
+    # Власна сесія: генератор працює вже після виходу з обробника (і після закриття залежності get_db).
+    # Довге читання без записів — на репліку, якщо вона налаштована
+    async with database.ReadSessionLocal() as db:
+        result = await crud.stream_donations_export(db, project_id=project_id, date_from=date_from,
+                                                    date_to=date_to, batch_size=EXPORT_BATCH_SIZE)
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        async for rows in result.partitions():
+            # Один фрагмент відповіді на пачку рядків, щоб не робити тисячі дрібних записів у сокет
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow([
+                        row.id, row.amount, row.donation_date.isoformat() if row.donation_date else "",
+                        row.message or "", row.user_id, row.donor_email or "", row.donor_name or "",
+                        row.project_id, row.project_name or "",
+                    ])
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps({
+                    **row._asdict(),
+                    "donation_date": row.donation_date.isoformat() if row.donation_date else None,
+                }, ensure_ascii=False) + "\n" for row in rows)
+
+
+@router.get("/export")  # Тільки для адміна
+async def export_donations_admin(
+        export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+        project_id: Optional[int] = Query(None, gt=0),
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        current_user: models.User = Depends(get_current_admin_user)
+):
+    media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_donations(export_format, project_id, date_from, date_to),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="donations.{export_format}"'},
+    )
+
+
+async def _iter_lines(request: Request):
+    """Читає тіло запиту потоково й віддає рядки тексту, не тримаючи весь файл у пам'яті."""
+    # Інкрементальний декодер: багатобайтовий символ може бути розірваний між чанками
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _iter_import_records(request: Request):
+    """(номер рядка, dict) з CSV, NDJSON (обидва потоково) або JSON-масиву."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "application/json":
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of donations")
+        for number, record in enumerate(records, start=1):
+            yield number, record
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        number = 0
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    elif content_type in ("text/csv", "text/plain", "application/octet-stream"):
+        header = None
+        record_text = ""
+        number = 0
+        async for line in _iter_lines(request):
+            record_text += line
+            # Поле в лапках може містити перенос рядка: чекаємо, доки лапки не закриються
+            if record_text.count('"') % 2:
+                continue
+            values = next(csv.reader(io.StringIO(record_text)), [])
+            record_text = ""
+            if not values:
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            number += 1
+            # Порожні клітинки CSV -> відсутні значення
+            yield number, {key: value for key, value in zip(header, values) if value != ""}
+    else:
+        raise HTTPException(status_code=415, detail="Use text/csv, application/x-ndjson or application/json")
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+
+
+@router.post("/import", response_model=schemas.DonationImportResult)  # Тільки для адміна
+async def import_donations_admin(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.User = Depends(get_current_admin_user)
+):
+    imported = 0
+    failed = 0
+    errors = []  # Зберігаємо лише перші IMPORT_MAX_REPORTED_ERRORS помилок
+    batch = []
+
+    def report(batch_errors):
+        nonlocal failed
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:IMPORT_MAX_REPORTED_ERRORS - len(errors)])
+
+    async def flush():
+        nonlocal imported
+        batch_errors = await crud.bulk_create_donations(db, batch)
+        imported += len(batch) - len(batch_errors)
+        report(batch_errors)
+        batch.clear()
+
+    async for number, record in _iter_import_records(request):
+        if not isinstance(record, dict):
+            report([(number, "Row is not an object")])
+            continue
+        try:
+            batch.append((number, schemas.DonationImport(**record)))
+        except ValidationError as e:
+            report([(number, _format_validation_error(e))])
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort()
+    stick_to_primary(response)
+    return schemas.DonationImportResult(
+        imported=imported,
+        failed=failed,
+        errors=[schemas.DonationImportError(row=row, error=error) for row, error in errors],
+        errors_truncated=failed > len(errors),
+    )
+
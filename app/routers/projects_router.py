@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status, Path
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from app.mongo_crud import add_activity_log
+from app.mongo_crud import log_activity
 from app.schemas import ActivityLogBase
-from app import crud, schemas, models
-from app.database import get_db
+from app import crud, schemas, models, fragment_cache, views, idempotency
+from app.templating import templates
+from app.database import get_db, get_read_db, stick_to_primary
 from app.dependencies import get_current_user_optional, get_current_admin_user, get_current_user
+from app.etag import make_etag, is_not_modified, not_modified, user_etag_part
+from app.progress_stream import progress_broadcaster, ALL_PROJECTS
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+PAGE_SIZE = 20
+# Сторінки залежать від користувача: браузер може кешувати, але має перевіряти ETag
+PERSONALIZED_CACHE_CONTROL = "private, no-cache"
 
 
 # --- HTML Endpoints for Projects ---
@@ -18,28 +23,58 @@ templates = Jinja2Templates(directory="app/templates")
 @router.get("/", response_class=HTMLResponse)
 async def list_projects_html(
         request: Request,
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_user_optional)
 ):
-    projects = crud.get_projects(db, active_only=True)  # Показуємо тільки активні на головній
+    state = await crud.get_projects_etag_state(db, active_only=True)
+    etag = make_etag("projects", state, cursor, request.url.query, user_etag_part(current_user))
+    if is_not_modified(request, etag):
+        return not_modified(etag, PERSONALIZED_CACHE_CONTROL)
+
+    # Публічний список однаковий для всіх відвідувачів, тому кешується як відрендерений фрагмент.
+    # Стан з ETag входить у ключ: invalidate() чистить кеш лише свого воркера, а зміну, зроблену іншим
+    # воркером, видно тут у state — тоді свіжий ETag ніколи не віддається разом зі старим фрагментом.
+    cache_key = ("projects", True, cursor, str(request.base_url), state)
+    fragment = fragment_cache.get(cache_key)
+    if fragment is None:
+        generation = fragment_cache.generation()
+        # Показуємо тільки активні на головній
+        page = await crud.get_projects_page(db, cursor=cursor, limit=PAGE_SIZE, active_only=True)
+        projects = views.project_views(page.items)
+        await views.release(db)
+        fragment = {
+            "html": fragment_cache.render(templates, "fragments/project_items.html", request,
+                                          projects=projects, is_admin_page=False),
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        }
+        fragment_cache.set(cache_key, fragment, generation)
     return templates.TemplateResponse("projects_list.html", {
         "request": request,
-        "projects": projects,
+        "projects_html": fragment["html"],
+        "next_cursor": fragment["next_cursor"],
+        "prev_cursor": fragment["prev_cursor"],
         "current_user": current_user,
         "is_admin_page": False  # Для відображення адмін-контролів
-    })
+    }, headers={"ETag": etag, "Cache-Control": PERSONALIZED_CACHE_CONTROL})
 
 
 @router.get("/all", response_class=HTMLResponse)  # Адмінська сторінка всіх проєктів
 async def list_all_projects_admin_html(
         request: Request,
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
-    projects = crud.get_projects(db)  # Адмін бачить всі
+    page = await crud.get_projects_page(db, cursor=cursor, limit=PAGE_SIZE)  # Адмін бачить всі
+    projects = views.project_views(page.items)
+    await views.release(db)
     return templates.TemplateResponse("projects_list.html", {
         "request": request,
         "projects": projects,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
         "current_user": current_user,
         "is_admin_page": True
     })
@@ -51,10 +86,15 @@ async def new_project_form_html(request: Request, current_user: models.User = De
         "request": request,
         "current_user": current_user,
         "project": None,  # Для нової форми
-        "form_action_url": "/projects/new"
+        "form_action_url": "/projects/new",
+        "idempotency_key": idempotency.new_form_key()
     })
 
 
+def _project_created_redirect(project_id: int):
+    return stick_to_primary(RedirectResponse(url=f"/projects/{project_id}", status_code=status.HTTP_303_SEE_OTHER))
+
+
 @router.post("/new", response_class=HTMLResponse)  # Create - POST data
 async def create_project_html(
         request: Request,
@@ -62,13 +102,21 @@ async def create_project_html(
         description: Optional[str] = Form(None),
         target_amount: float = Form(...),
         is_active: bool = Form(True),  # За замовчуванням активний
-        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = Form(None),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
+    key = idempotency.get_key(request, current_user.id, "project", idempotency_key)
+    if key is not None:
+        project_id = await idempotency.get_resource_id(db, key)
+        if project_id is not None:
+            return _project_created_redirect(project_id)  # Повтор уже виконаного запиту
+
     if target_amount <= 0:
         return templates.TemplateResponse("project_form.html", {
             "request": request, "current_user": current_user, "project": None,
             "form_action_url": "/projects/new",
+            "idempotency_key": idempotency_key or idempotency.new_form_key(),
             "error": "Target amount must be positive."
         }, status_code=status.HTTP_400_BAD_REQUEST)
 
@@ -78,23 +126,62 @@ async def create_project_html(
         target_amount=target_amount,
         is_active=is_active
     )
-    project = crud.create_project(db=db, project=project_in)
-    await add_activity_log(ActivityLogBase(
+    try:
+        project = await crud.create_project(db=db, project=project_in, idempotency_key=key)
+    except idempotency.DuplicateRequest:
+        # Паралельний дублікат: проєкт уже створив інший запит
+        return _project_created_redirect(await idempotency.get_resource_id(db, key))
+    log_activity(ActivityLogBase(
         user_email=current_user.email,
         action="CREATE_PROJECT",
         details={"project_id": project.id, "project_name": project.name}
     ))
-    return RedirectResponse(url=f"/projects/{project.id}", status_code=status.HTTP_303_SEE_OTHER)
+    return _project_created_redirect(project.id)
+
+
+# --- Живий прогрес зборів (Server-Sent Events) ---
+# Оголошені до /{project_id}, інакше "stream" матчився б як project_id
+
+async def _progress_stream_response(project_id: Optional[int]):
+    try:
+        sub = await progress_broadcaster.subscribe(project_id)
+    except OverflowError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many live connections",
+                            headers={"Retry-After": "30"})
+    if sub is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return StreamingResponse(progress_broadcaster.events(sub), media_type="text/event-stream",
+                             # X-Accel-Buffering: nginx не повинен буферизувати потік подій
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/stream")  # Прогрес усіх активних проєктів: спершу snapshot, далі події progress
+async def stream_all_projects_progress():
+    return await _progress_stream_response(ALL_PROJECTS)
+
+
+@router.get("/{project_id}/stream")  # Прогрес одного проєкту
+async def stream_project_progress(project_id: int = Path(..., gt=0)):
+    return await _progress_stream_response(project_id)
 
 
 @router.get("/{project_id}", response_class=HTMLResponse)  # Read one
 async def read_project_html(
         request: Request,
         project_id: int = Path(..., gt=0),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
         current_user: models.User = Depends(get_current_user_optional)
 ):
-    project = crud.get_project(db, project_id=project_id)
+    # Версія проєкту + остання пожертва: якщо клієнт вже має цю сторінку, відповідаємо 304 без рендеру
+    state = await crud.get_project_etag_state(db, project_id=project_id)
+    etag = None
+    if state is not None:
+        etag = make_etag("project", project_id, state, request.url.query, user_etag_part(current_user))
+        is_visible = state[1] or (current_user and current_user.role == 'admin')
+        if is_visible and is_not_modified(request, etag):
+            return not_modified(etag, PERSONALIZED_CACHE_CONTROL)
+
+    project = await crud.get_project(db, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -102,25 +189,28 @@ async def read_project_html(
     if not project.is_active and (not current_user or current_user.role != 'admin'):
         raise HTTPException(status_code=404, detail="Project not found or not active")
 
-    donations = crud.get_donations_for_project(db, project_id=project_id, limit=20)
+    donations = views.donation_views(await crud.get_donations_for_project(db, project_id=project_id, limit=20))
+    project = views.project_view(project)
+    await views.release(db)
     return templates.TemplateResponse("project_detail.html", {
         "request": request,
         "project": project,
         "donations": donations,
         "current_user": current_user
-    })
+    }, headers={"ETag": etag, "Cache-Control": PERSONALIZED_CACHE_CONTROL} if etag else None)
 
 
 @router.get("/{project_id}/edit", response_class=HTMLResponse)  # Update - GET form
 async def edit_project_form_html(
         request: Request,
         project_id: int = Path(..., gt=0),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
-    project = crud.get_project(db, project_id=project_id)
+    project = views.project_view(await crud.get_project(db, project_id=project_id))
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await views.release(db)
     return templates.TemplateResponse("project_form.html", {
         "request": request,
         "project": project,
@@ -137,16 +227,18 @@ async def update_project_html(
         description: Optional[str] = Form(None),
         target_amount: float = Form(...),
         is_active: bool = Form(False),  # Якщо checkbox не відмічений, False
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
-    project_db = crud.get_project(db, project_id=project_id)
+    project_db = await crud.get_project(db, project_id=project_id)
     if not project_db:
         raise HTTPException(status_code=404, detail="Project not found")
 
     if target_amount <= 0:
+        project = views.project_view(project_db)
+        await views.release(db)
         return templates.TemplateResponse("project_form.html", {
-            "request": request, "current_user": current_user, "project": project_db,
+            "request": request, "current_user": current_user, "project": project,
             "form_action_url": f"/projects/{project_id}/edit",
             "error": "Target amount must be positive."
         }, status_code=status.HTTP_400_BAD_REQUEST)
@@ -158,26 +250,27 @@ async def update_project_html(
         is_active=is_active
     )
 
-    updated_project = crud.update_project(db=db, project_id=project_id, project_update=project_update_data)
+    updated_project = await crud.update_project(db=db, project_id=project_id, project_update=project_update_data)
     if not updated_project:  # Додаткова перевірка, хоча вище вже є
         raise HTTPException(status_code=404, detail="Project not found during update")
 
-    return RedirectResponse(url=f"/projects/{updated_project.id}", status_code=status.HTTP_303_SEE_OTHER)
+    return stick_to_primary(RedirectResponse(url=f"/projects/{updated_project.id}",
+                                             status_code=status.HTTP_303_SEE_OTHER))
 
 
 @router.post("/{project_id}/delete", response_class=HTMLResponse)  # Delete
 async def delete_project_html(
         request: Request,  # Не використовується, але FastAPI може вимагати
         project_id: int = Path(..., gt=0),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_admin_user)
 ):
-    project = crud.get_project(db, project_id=project_id)
+    project = await crud.get_project(db, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Перевірка наявності пожертв перед видаленням (опціонально, але гарна практика)
-    donations_for_project = crud.get_donations_for_project(db, project_id=project_id, limit=1)
+    donations_for_project = await crud.get_donations_for_project(db, project_id=project_id, limit=1)
     if donations_for_project:
         # Не дозволяємо видалення, якщо є пожертви. Можна перенаправити з повідомленням про помилку.
         # Або деактивувати проєкт замість видалення.
@@ -187,6 +280,6 @@ async def delete_project_html(
         return RedirectResponse(url="/projects/all?error=Cannot_delete_project_with_donations",
                                 status_code=status.HTTP_303_SEE_OTHER)
 
-    crud.delete_project(db=db, project_id=project_id)
-    return RedirectResponse(url="/projects/all?message=Project_deleted_successfully",
-                            status_code=status.HTTP_303_SEE_OTHER)
\ No newline at end of file
+    await crud.delete_project(db=db, project_id=project_id)
+    return stick_to_primary(RedirectResponse(url="/projects/all?message=Project_deleted_successfully",
+                                             status_code=status.HTTP_303_SEE_OTHER))
\ No newline at end of file
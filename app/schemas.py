@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter
 from typing import Optional, List, Any
-from datetime import datetime
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -21,8 +21,7 @@ class User(UserBase):
     role: str
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Project Schemas
 class ProjectBase(BaseModel):
@@ -47,8 +46,11 @@ class Project(ProjectBase):
     created_at: datetime
     # donations: List['Donation'] = [] # Щоб уникнути циклічної залежності, можна так
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Валідація з атрибутів (ORM-об'єкт або рядок вибірки) і серіалізація одразу в JSON-байти (pydantic-core)
+project_adapter = TypeAdapter(Project)
+project_list_adapter = TypeAdapter(List[Project])
 
 # Donation Schemas
 class DonationBase(BaseModel):
@@ -58,6 +60,39 @@ class DonationBase(BaseModel):
 class DonationCreate(DonationBase):
     project_id: int
 
+class DonationImport(DonationCreate):
+    # Рядок масового імпорту (офлайн / банківські перекази)
+    amount: float = Field(..., gt=0)
+    user_id: Optional[int] = None
+    donation_date: Optional[datetime] = None
+
+class DonationImportError(BaseModel):
+    row: int
+    error: str
+
+class DonationImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[DonationImportError] = []
+    errors_truncated: bool = False
+
+# Статистика з денних агрегатів (donation_daily_rollups)
+class ProjectDonationTotals(BaseModel):
+    project_id: int
+    name: str
+    total_amount: float
+    donation_count: int
+
+class DailyDonationTotals(BaseModel):
+    day: date
+    total_amount: float
+    donation_count: int
+    unique_donors: Optional[int] = None # Лише для статистики одного проєкту
+
+class DonationStats(BaseModel):
+    projects: List[ProjectDonationTotals] = []
+    daily: List[DailyDonationTotals] = []
+
 class Donation(DonationBase):
     id: int
     donation_date: datetime
@@ -66,8 +101,7 @@ class Donation(DonationBase):
     donor: Optional[User] = None # Для відображення інформації про донора
     project: Optional[ProjectBase] = None # Для відображення інформації про проєкт
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Token Schemas (for auth.py)
 class Token(BaseModel):
@@ -91,9 +125,10 @@ class ActivityLogBase(BaseModel):
 class ActivityLogInDB(ActivityLogBase):
     id: str = Field(alias="_id") # MongoDB використовує _id
 
-    class Config:
-        orm_mode = True
-        populate_by_name = True # Дозволяє використовувати _id як id
-        json_encoders = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        populate_by_name=True, # Дозволяє використовувати _id як id
+        json_encoders={
             datetime: lambda dt: dt.isoformat()
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
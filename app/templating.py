@@ -0,0 +1,43 @@
+# Одне середовище Jinja2 на процес для main.py і всіх роутерів (раніше кожен модуль мав власне —
+# і кожен заново компілював base.html та сторінки). Шаблони компілюються під час старту (warm_up),
+# а байткод кешується на диску, тож наступні воркери й перезапуски не компілюють їх з вихідного коду.
+import os
+import time
+from typing import Optional
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+# Перевірка mtime файлу шаблону на кожен рендер; вмикати лише для розробки
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+TEMPLATES_BYTECODE_CACHE = os.getenv("TEMPLATES_BYTECODE_CACHE", "true").lower() in ("1", "true", "yes")
+# За замовчуванням — приватний каталог користувача в системному tmp (так його створює сам Jinja2)
+TEMPLATES_BYTECODE_CACHE_DIR = os.getenv("TEMPLATES_BYTECODE_CACHE_DIR")
+
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    if not TEMPLATES_BYTECODE_CACHE:
+        return None
+    if TEMPLATES_BYTECODE_CACHE_DIR:
+        os.makedirs(TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+        return jinja2.FileSystemBytecodeCache(TEMPLATES_BYTECODE_CACHE_DIR)
+    return jinja2.FileSystemBytecodeCache()
+
+
+templates = Jinja2Templates(env=jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+))
+
+
+def warm_up() -> int:
+    """Компілює всі шаблони з app/templates, щоб перший запит після деплою не платив за компіляцію."""
+    start = time.perf_counter()
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    print(f"Compiled {len(names)} templates in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return len(names)
@@ -0,0 +1,130 @@
+# In-process кеш автентифікованих користувачів.
+# Замість jwt.decode + SELECT на кожен запит зберігаємо розкодовані токени та "знімки" користувачів.
+#
+# Кеш живе окремо в кожному воркері, і invalidate_user() чистить лише поточний процес. Зміна ролі,
+# блокування чи видалення користувача, зроблені в іншому воркері або напряму в БД, інші воркери
+# побачать щонайпізніше через USER_CACHE_TTL_SECONDS — це і є межа застарівання прав доступу.
+# Тому TTL знімків навмисно короткий; не збільшуйте його без міжпроцесної інвалідації.
+# Токени незмінні (sub не змінюється, exp враховується окремо), тож їх можна кешувати довше.
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 15))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Незмінна копія полів користувача, потрібних для авторизації та шапки сторінки."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_orm(cls, user) -> "UserSnapshot":
+        return cls(id=user.id, email=user.email, full_name=user.full_name,
+                   role=user.role, is_active=user.is_active)
+
+
+class TTLCache:
+    """Простий LRU-кеш з обмеженим розміром і часом життя записів."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# token -> email (sub) з урахуванням exp токена
+token_cache = TTLCache(USER_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS)
+# email -> UserSnapshot
+user_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def get_token_subject(token: str) -> Optional[str]:
+    return token_cache.get(token)
+
+
+def set_token_subject(token: str, email: str, exp: Optional[float] = None):
+    # Не тримаємо токен у кеші довше, ніж він дійсний
+    ttl = None if exp is None else exp - time.time()
+    if ttl is not None and ttl <= 0:
+        return
+    token_cache.set(token, email, ttl)
+
+
+def get_user(email: str) -> Optional[UserSnapshot]:
+    return user_cache.get(email)
+
+
+def set_user(user) -> UserSnapshot:
+    snapshot = UserSnapshot.from_orm(user)
+    user_cache.set(snapshot.email, snapshot)
+    return snapshot
+
+
+def invalidate_user(email: str):
+    """Викликати при зміні ролі, статусу активності чи видаленні користувача.
+
+    Діє лише на кеш поточного воркера: інші процеси тримають старий знімок до
+    USER_CACHE_TTL_SECONDS. Зараз інвалідацію робить тільки crud.update_user.
+    """
+    user_cache.pop(email)
+
+
+def clear():
+    token_cache.clear()
+    user_cache.clear()
+
+
+def stats() -> dict:
+    return {
+        "token_hits": token_cache.hits,
+        "token_misses": token_cache.misses,
+        "token_size": len(token_cache),
+        "user_hits": user_cache.hits,
+        "user_misses": user_cache.misses,
+        "user_size": len(user_cache),
+    }
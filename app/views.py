@@ -0,0 +1,65 @@
+# Незмінні "знімки" даних для шаблонів. Обробник повністю матеріалізує сторінку в ці об'єкти,
+# повертає з'єднання в пул (release) і лише потім рендерить — Jinja вже не тримає сесію і не робить запитів.
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .user_cache import UserSnapshot
+
+
+@dataclass(frozen=True, slots=True)
+class ProjectView:
+    id: int
+    name: str
+    description: Optional[str]
+    target_amount: float
+    current_amount: float
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_orm(cls, project) -> "ProjectView":
+        return cls(id=project.id, name=project.name, description=project.description,
+                   target_amount=project.target_amount, current_amount=project.current_amount,
+                   is_active=project.is_active, created_at=project.created_at)
+
+
+@dataclass(frozen=True, slots=True)
+class DonationView:
+    id: int
+    amount: float
+    message: Optional[str]
+    donation_date: Optional[datetime]
+    user_id: Optional[int]
+    project_id: int
+    donor: Optional[UserSnapshot]
+    project: Optional[ProjectView]
+
+    @classmethod
+    def from_orm(cls, donation) -> "DonationView":
+        # donor / project мають бути завантажені заздалегідь (joinedload у crud), інакше тут був би lazy load
+        donor, project = donation.donor, donation.project
+        return cls(id=donation.id, amount=donation.amount, message=donation.message,
+                   donation_date=donation.donation_date, user_id=donation.user_id, project_id=donation.project_id,
+                   donor=UserSnapshot.from_orm(donor) if donor is not None else None,
+                   project=ProjectView.from_orm(project) if project is not None else None)
+
+
+def project_view(project) -> Optional[ProjectView]:
+    return ProjectView.from_orm(project) if project is not None else None
+
+
+def project_views(projects: Iterable) -> List[ProjectView]:
+    return [ProjectView.from_orm(project) for project in projects]
+
+
+def donation_views(donations: Iterable) -> List[DonationView]:
+    return [DonationView.from_orm(donation) for donation in donations]
+
+
+async def release(db: AsyncSession):
+    """Завершує транзакцію сесії й повертає з'єднання в пул до рендеру шаблону.
+    Сесією можна користуватись і далі — вона візьме нове з'єднання."""
+    await db.close()
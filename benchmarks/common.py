@@ -0,0 +1,75 @@
+# Спільне для бенчмарків: тимчасова SQLite-база (схема — тими самими міграціями) і застосунок у тому ж
+# процесі через httpx.ASGITransport — так видно, що саме блокує event loop воркера.
+# use_temp_database() викликати до імпорту app: налаштування читаються з оточення під час імпорту.
+import os
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "adminpassword"
+
+
+def use_temp_database(**env) -> str:
+    directory = tempfile.mkdtemp(prefix="donations-bench-")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{directory}/bench.db",
+        "ADMIN_EMAIL": ADMIN_EMAIL,
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "ACTIVITY_LOG_SPOOL_PATH": os.path.join(directory, "activity_log_spool.jsonl"),
+        "SLOW_QUERY_LOG_PATH": os.path.join(directory, "slow_queries.jsonl"),
+        # MongoDB для бенчмарків не потрібна: логи активності йдуть у spool у тимчасовому каталозі
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS": "100",
+        "LOGIN_RATE_LIMIT_ENABLED": "false",
+        **env,
+    })
+    os.environ.pop("READ_REPLICA_DATABASE_URL", None)
+    os.chdir(PROJECT_ROOT)  # StaticFiles(directory="app/static")
+    return directory
+
+
+@asynccontextmanager
+async def app_client(**kwargs):
+    """Клієнт до застосунку після startup_event (міграції, адмін, фонові задачі); shutdown — на виході."""
+    import httpx
+    from app import main
+    await main.startup_event()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench",
+                                     **kwargs) as client:
+            yield client
+    finally:
+        await main.shutdown_event()
+
+
+async def login(client, email: str = ADMIN_EMAIL, password: str = ADMIN_PASSWORD):
+    response = await client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 303, response.text
+
+
+async def create_projects(client, count: int, prefix: str = "Bench project"):
+    """Проєкти через HTML-форму адміна (client має бути залогінений)."""
+    for i in range(count):
+        response = await client.post("/projects/new", data={
+            "name": f"{prefix} {i}", "description": f"Опис {i}", "target_amount": 1000 + i, "is_active": "true"})
+        assert response.status_code == 303, response.text
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summary_ms(values) -> str:
+    return (f"median {statistics.median(values) * 1000:.2f} ms, p99 {percentile(values, 99) * 1000:.2f} ms "
+            f"(n={len(values)})")
+
+
+def timed(func, *args, repeat: int = 1) -> float:
+    """Середній час одного виклику, с."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat
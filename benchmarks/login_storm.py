@@ -0,0 +1,78 @@
+# Шторм логінів: пропускна здатність /auth/login і латентність звичайних сторінок (/projects/) під час шторму.
+# --inline відтворює стару поведінку (bcrypt прямо в event loop) для порівняння з пулом.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.login_storm [--logins 40] [--concurrency 16] [--inline]
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_temp_database, app_client, login, create_projects, summary_ms, ADMIN_EMAIL, \
+    ADMIN_PASSWORD
+
+
+async def probe_pages(client, stop: asyncio.Event, latencies: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/projects/")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+        await asyncio.sleep(interval)
+
+
+async def main(logins: int, concurrency: int, inline: bool):
+    from app import auth
+    if inline:
+        async def run_inline(func, *args):
+            return func(*args)
+        auth._run_password_job = run_inline
+
+    async with app_client() as admin:
+        await login(admin)
+        await create_projects(admin, 20)
+        pages = admin.__class__(transport=admin._transport, base_url=admin.base_url)
+
+        baseline = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_pages(pages, stop, baseline))
+        await asyncio.sleep(2)
+        stop.set()
+        await probe
+
+        statuses = {}
+        queue = asyncio.Queue()
+        for _ in range(logins):
+            queue.put_nowait(None)
+
+        async def storm_worker(client):
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.post("/auth/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        during = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_pages(pages, stop, during))
+        start = time.perf_counter()
+        clients = [admin.__class__(transport=admin._transport, base_url=admin.base_url) for _ in range(concurrency)]
+        await asyncio.gather(*(storm_worker(client) for client in clients))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+        for client in clients + [pages]:
+            await client.aclose()
+
+    print(f"password hashing:   {'inline (event loop)' if inline else f'{auth.PASSWORD_HASH_EXECUTOR} pool, {auth.PASSWORD_HASH_WORKERS} workers'}")
+    print(f"logins:             {logins} with {concurrency} concurrent clients in {elapsed:.2f} s "
+          f"-> {logins / elapsed:.1f} logins/s, statuses {statuses}")
+    print(f"/projects/ idle:    {summary_ms(baseline)}")
+    print(f"/projects/ storm:   {summary_ms(during)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    use_temp_database()
+    asyncio.run(main(args.logins, args.concurrency, args.inline))
@@ -0,0 +1,83 @@
+# Накладні витрати MetricsMiddleware і лічильників SQL (app/metrics.py).
+# 1) Сам middleware навколо порожнього ASGI-застосунку — чиста ціна на запит, у мікросекундах.
+# 2) Реальні запити з метриками і без (METRICS_ENABLED перемикається між раундами, раунди чергуються,
+#    щоб дрейф кешів і бази однаково впливав на обидва варіанти).
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.metrics_overhead [--requests 300] [--rounds 6]
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import use_temp_database, app_client, login, create_projects, summary_ms
+
+ROUTES = ["/api/projects/", "/projects/", "/projects/1"]
+
+
+async def middleware_cost(calls: int) -> tuple:
+    from app import metrics
+
+    async def bare_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/projects/", "headers": []}
+    wrapped = metrics.MetricsMiddleware(bare_app)
+
+    async def measure(app) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - start) / calls
+
+    await measure(wrapped)  # Прогрів: створення серій міток
+    bare, instrumented = [], []
+    for _ in range(5):
+        bare.append(await measure(bare_app))
+        instrumented.append(await measure(wrapped))
+    return statistics.median(bare), statistics.median(instrumented)
+
+
+async def main(requests: int, rounds: int):
+    from app import metrics
+
+    bare, instrumented = await middleware_cost(20000)
+    print(f"middleware alone:   bare {bare * 1e6:.1f} us, with metrics {instrumented * 1e6:.1f} us "
+          f"-> +{(instrumented - bare) * 1e6:.1f} us per request")
+
+    async with app_client() as client:
+        await login(client)
+        await create_projects(client, 20)
+        for route in ROUTES:
+            latencies = {True: [], False: []}
+            for _ in range(requests // 10):  # Прогрів кешів фрагментів і з'єднань
+                assert (await client.get(route)).status_code == 200
+            for i in range(rounds * 2):
+                enabled = i % 2 == 0
+                metrics.METRICS_ENABLED = enabled
+                for _ in range(requests // rounds):
+                    start = time.perf_counter()
+                    response = await client.get(route)
+                    latencies[enabled].append(time.perf_counter() - start)
+                    assert response.status_code == 200
+            metrics.METRICS_ENABLED = True
+            off, on = statistics.median(latencies[False]), statistics.median(latencies[True])
+            print(f"{route}")
+            print(f"  metrics off:      {summary_ms(latencies[False])}")
+            print(f"  metrics on:       {summary_ms(latencies[True])}")
+            print(f"  overhead:         {(on - off) * 1e6:+.0f} us median ({(on - off) / off * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=6)
+    args = parser.parse_args()
+    use_temp_database()
+    asyncio.run(main(args.requests, args.rounds))
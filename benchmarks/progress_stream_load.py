@@ -0,0 +1,70 @@
+# Навантажувальний тест живого прогресу (SSE): пам'ять на з'єднання, час розсилки однієї події всім
+# глядачам і кількість запитів до БД, коли всі глядачі підключаються одночасно.
+# Без HTTP і БД: кожен глядач — задача, що читає ProgressBroadcaster.events() так само, як StreamingResponse,
+# а _load підмінено лічильником. Запуск з кореня репозиторію:
+#   python -m benchmarks.progress_stream_load [--subscribers 10000] [--events 20]
+import argparse
+import asyncio
+import gc
+import statistics
+import time
+import tracemalloc
+
+from app.progress_stream import ProgressBroadcaster
+
+PROJECT_ID = 1
+
+
+async def main(subscribers: int, events: int):
+    broadcaster = ProgressBroadcaster(max_subscribers=subscribers + 1)
+    loads = 0
+
+    async def load(project_ids):
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.005)  # Умовний час запиту до БД
+        return broadcaster._merge({PROJECT_ID: (0.0, 1_000_000.0)}, project_ids)
+
+    broadcaster._load = load
+    received = [0] * subscribers
+
+    async def viewer(index: int, sub):
+        async for _ in broadcaster.events(sub):
+            received[index] += 1
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subs = await asyncio.gather(*(broadcaster.subscribe(PROJECT_ID) for _ in range(subscribers)))
+    tasks = [asyncio.create_task(viewer(i, sub)) for i, sub in enumerate(subs)]
+    while any(sub.messages for sub in subs):
+        await asyncio.sleep(0)  # Усі глядачі прочитали snapshot і чекають на події
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    enqueue, delivery = [], []
+    for _ in range(events):
+        broadcaster.publish(PROJECT_ID, 10.0)
+        start = time.perf_counter()
+        broadcaster._flush()  # Одна зведена подія, серіалізована один раз -> черги всіх підписників
+        enqueue.append(time.perf_counter() - start)
+        while any(sub.messages for sub in subs):
+            await asyncio.sleep(0)  # Глядачі прокидаються і забирають подію
+        delivery.append(time.perf_counter() - start)
+    for sub in subs:
+        sub.close()
+    await asyncio.gather(*tasks)
+
+    print(f"subscribers:              {subscribers}")
+    print(f"DB loads on connect:      {loads}")
+    print(f"memory per connection:    {per_connection / 1024:.2f} KB (subscription + reader task)")
+    print(f"fan-out per event:        median {statistics.median(enqueue) * 1000:.2f} ms "
+          f"(enqueue), {statistics.median(delivery) * 1000:.2f} ms (all readers woken)")
+    print(f"events delivered:         {sum(received)} of {subscribers * (events + 1)} (incl. snapshot)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.events))
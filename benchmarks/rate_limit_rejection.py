@@ -0,0 +1,108 @@
+# Ціна відхиленої спроби входу: TokenBucketLimiter.take і rate_limit.check_login у мікросекундах (з повною
+# таблицею відер), а також повний запит /auth/token, відхилений з 429, проти звичайної невдалої спроби
+# (пошук користувача + bcrypt). Відхилений запит не повинен виконувати жодного SQL.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.rate_limit_rejection [--calls 100000] [--requests 300] [--backend memory|db]
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import use_temp_database, app_client, summary_ms, timed, ADMIN_EMAIL
+
+
+def make_request(ip: str = "203.0.113.7"):
+    from fastapi import Request
+    return Request({"type": "http", "method": "POST", "path": "/auth/token", "headers": [],
+                    "client": (ip, 40000)})
+
+
+def limiter_cost(calls: int) -> tuple:
+    from app.rate_limit import TokenBucketLimiter, LOGIN_RATE_LIMIT_MAX_KEYS
+    limiter = TokenBucketLimiter("bench", capacity=5, per_minute=5)
+    for i in range(LOGIN_RATE_LIMIT_MAX_KEYS):  # Таблиця відер заповнена до межі — найгірший випадок для LRU
+        limiter.take(f"198.51.{i // 256 % 256}.{i % 256}-{i}")
+    for _ in range(5):
+        limiter.take("attacker")
+    assert limiter.take("attacker") > 0
+    rejected = timed(limiter.take, "attacker", repeat=calls)
+    new_keys = [f"new-{i}" for i in range(calls)]
+    start = time.perf_counter()
+    for key in new_keys:  # Новий ключ із витісненням найстарішого
+        limiter.take(key)
+    return rejected, (time.perf_counter() - start) / calls
+
+
+async def check_login_cost(calls: int) -> float:
+    from app import rate_limit
+    request = make_request()
+    while await rate_limit.check_login(request, "victim@example.com") is None:
+        pass
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls // 5):
+            assert await rate_limit.check_login(request, "victim@example.com")
+        samples.append((time.perf_counter() - start) / (calls // 5))
+    return statistics.median(samples)
+
+
+async def http_cost(requests: int) -> tuple:
+    from sqlalchemy import event
+    from app import rate_limit
+    from app.database import get_engine
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    async with app_client() as client:
+        async def attempt() -> tuple:
+            start = time.perf_counter()
+            response = await client.post("/auth/token", data={"username": ADMIN_EMAIL, "password": "wrong"})
+            return time.perf_counter() - start, response.status_code
+
+        # Звичайна невдала спроба: ліміт не заважає, працюють пошук користувача і bcrypt
+        rate_limit.LOGIN_RATE_LIMIT_ENABLED = False
+        failed = []
+        for _ in range(10):
+            elapsed, status = await attempt()
+            assert status == 401
+            failed.append(elapsed)
+
+        rate_limit.LOGIN_RATE_LIMIT_ENABLED = True
+        while (await attempt())[1] != 429:
+            pass
+        event.listen(get_engine().sync_engine, "before_cursor_execute", listener)
+        rejected = []
+        for _ in range(requests):
+            elapsed, status = await attempt()
+            assert status == 429
+            rejected.append(elapsed)
+        event.remove(get_engine().sync_engine, "before_cursor_execute", listener)
+    return failed, rejected, len(statements)
+
+
+async def main(calls: int, requests: int):
+    from app import rate_limit
+    take_rejected, take_new_key = limiter_cost(calls)
+    print(f"backend:                {rate_limit.LOGIN_RATE_LIMIT_BACKEND}")
+    print(f"limiter.take rejected:  {take_rejected * 1e6:.2f} us "
+          f"({rate_limit.LOGIN_RATE_LIMIT_MAX_KEYS} keys in the table)")
+    print(f"limiter.take new key:   {take_new_key * 1e6:.2f} us (with LRU eviction)")
+    print(f"check_login rejected:   {await check_login_cost(calls // 10) * 1e6:.2f} us")
+
+    failed, rejected, statements = await http_cost(requests)
+    print(f"/auth/token 401:        {summary_ms(failed)}")
+    print(f"/auth/token 429:        {summary_ms(rejected)}, {statements} SQL statements")
+    print(f"rejection is x{statistics.median(failed) / statistics.median(rejected):.0f} cheaper than a failed login")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--backend", choices=["memory", "db"], default="memory")
+    args = parser.parse_args()
+    use_temp_database(LOGIN_RATE_LIMIT_ENABLED="true", LOGIN_RATE_LIMIT_BACKEND=args.backend)
+    from app import migrate
+    migrate.upgrade_database("head", configure_logger=False)  # Таблиця rate_limit_buckets потрібна ще до startup
+    asyncio.run(main(args.calls, args.requests))
@@ -0,0 +1,92 @@
+# Серіалізація списку проєктів для /api/projects/: старий шлях FastAPI (ORM-об'єкти -> model_validate ->
+# jsonable_encoder -> json.dumps), той самий шлях з orjson (ORJSONResponse) і новий — вибірка лише колонок
+# schemas.Project та TypeAdapter.dump_json одразу в байти (main.json_bytes_response).
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.serialization [--sizes 10 100 1000]
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import use_temp_database, timed
+
+
+def old_path(objects) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from app import schemas
+    content = jsonable_encoder([schemas.Project.model_validate(obj) for obj in objects])
+    # Так JSONResponse.render кодує тіло
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def old_path_orjson(objects) -> bytes:
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from app import schemas
+    return orjson.dumps(jsonable_encoder([schemas.Project.model_validate(obj) for obj in objects]),
+                        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def adapter_path(rows) -> bytes:
+    from app import schemas
+    adapter = schemas.project_list_adapter
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+async def seed(count: int):
+    from app import models
+    from app.database import SessionLocal
+    async with SessionLocal() as db:
+        db.add_all(models.Project(name=f"Bench project {i}", description=f"Опис проєкту {i} " * 4,
+                                  target_amount=1000 + i, current_amount=i * 3.5, is_active=True)
+                   for i in range(count))
+        await db.commit()
+
+
+async def fetch_cost(size: int, repeat: int) -> tuple:
+    from sqlalchemy import select
+    from app import crud, models
+    from app.database import SessionLocal
+
+    async def measure(fetch) -> tuple:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            async with SessionLocal() as db:
+                result = await fetch(db)
+        return (time.perf_counter() - start) / repeat, result
+
+    orm_time, objects = await measure(lambda db: _scalars(db, select(models.Project)
+                                                          .order_by(models.Project.created_at.desc()).limit(size)))
+    rows_time, rows = await measure(lambda db: crud.get_project_rows(db, limit=size, active_only=True))
+    return orm_time, objects, rows_time, rows
+
+
+async def _scalars(db, query):
+    return (await db.scalars(query)).all()
+
+
+async def main(sizes):
+    await seed(max(sizes))
+    print(f"{'projects':>8} | {'ORM fetch':>10} {'columns':>10} | {'old json':>10} {'old orjson':>10} "
+          f"{'TypeAdapter':>11} | speedup")
+    for size in sizes:
+        repeat = max(5, 2000 // size)
+        orm_time, objects, rows_time, rows = await fetch_cost(size, repeat)
+        assert len(objects) == len(rows) == size
+        assert json.loads(old_path(objects)) == json.loads(adapter_path(rows))
+        old = timed(old_path, objects, repeat=repeat)
+        old_orjson = timed(old_path_orjson, objects, repeat=repeat)
+        new = timed(adapter_path, rows, repeat=repeat)
+        print(f"{size:>8} | {orm_time * 1000:>7.2f} ms {rows_time * 1000:>7.2f} ms | {old * 1000:>7.2f} ms "
+              f"{old_orjson * 1000:>7.2f} ms {new * 1000:>8.2f} ms | "
+              f"x{old / new:.1f} serialize, x{(orm_time + old) / (rows_time + new):.1f} fetch+serialize")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    use_temp_database()
+    from app import migrate
+    migrate.upgrade_database("head", configure_logger=False)  # Сама запускає свій event loop
+    asyncio.run(main(args.sizes))
@@ -0,0 +1,106 @@
+# Час старту воркера: імпорт app.main, startup_event і перший запит — кожен запуск в окремому процесі,
+# щоб імпорти й кеші були холодними. Сценарії:
+#   import without database — імпорт не повинен торкатися БД (DATABASE_URL веде в неіснуючий каталог);
+#   first deploy            — порожня база, BOOTSTRAP_ON_STARTUP=true (міграції + bcrypt для адміна);
+#   restart, bootstrap on   — актуальна схема, bootstrap лише перевіряє версію й адміна;
+#   restart, bootstrap off  — прод: python -m app.bootstrap один раз, воркери з BOOTSTRAP_ON_STARTUP=false.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.startup [--runs 5]
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database, PROJECT_ROOT
+
+
+async def child(request: bool):
+    start = time.perf_counter()
+    from app import main
+    timings = {"import": time.perf_counter() - start}
+    if request:
+        import httpx
+        start = time.perf_counter()
+        await main.startup_event()
+        timings["startup"] = time.perf_counter() - start
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            for name in ("first request", "second request"):
+                start = time.perf_counter()
+                response = await client.get("/projects/")
+                timings[name] = time.perf_counter() - start
+                assert response.status_code == 200, response.text
+        start = time.perf_counter()
+        await main.shutdown_event()
+        timings["shutdown"] = time.perf_counter() - start
+    print("BENCH " + json.dumps(timings))
+
+
+def run_child(env: dict, request: bool = True) -> dict:
+    args = [sys.executable, "-m", "benchmarks.startup", "--child"] + ([] if request else ["--import-only"])
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=PROJECT_ROOT, env={**os.environ, **env}, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    line = next(line for line in result.stdout.splitlines() if line.startswith("BENCH "))
+    return {**json.loads(line[len("BENCH "):]), "process": elapsed}
+
+
+def run_bootstrap(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.bootstrap"], cwd=PROJECT_ROOT, env={**os.environ, **env},
+                   check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def report(name: str, runs: list):
+    keys = [key for key in ("import", "startup", "first request", "second request", "shutdown",
+                                         "process") if key in runs[0]]
+    parts = [f"{key} {statistics.median(run[key] for run in runs) * 1000:.0f} ms" for key in keys]
+    print(f"{name:<24} " + ", ".join(parts))
+
+
+def main(runs: int):
+    directory = use_temp_database()
+    database = os.path.join(directory, "bench.db")
+    url = f"sqlite:///{database}"
+
+    report("import without database", [
+        run_child({"DATABASE_URL": f"sqlite:///{directory}/missing/dir/none.db"}, request=False)
+        for _ in range(runs)])
+
+    first_deploy = []
+    for _ in range(runs):
+        if os.path.exists(database):
+            os.remove(database)
+        first_deploy.append(run_child({"DATABASE_URL": url, "BOOTSTRAP_ON_STARTUP": "true"}))
+    report("first deploy", first_deploy)
+
+    report("restart, bootstrap on", [run_child({"DATABASE_URL": url, "BOOTSTRAP_ON_STARTUP": "true"})
+                                     for _ in range(runs)])
+
+    os.remove(database)
+    bootstrap = [run_bootstrap({"DATABASE_URL": url})]
+    bootstrap += [run_bootstrap({"DATABASE_URL": url}) for _ in range(runs - 1)]
+    print(f"{'python -m app.bootstrap':<24} first {bootstrap[0] * 1000:.0f} ms, "
+          f"repeated {statistics.median(bootstrap[1:] or bootstrap) * 1000:.0f} ms (whole process)")
+    report("restart, bootstrap off", [run_child({"DATABASE_URL": url, "BOOTSTRAP_ON_STARTUP": "false"})
+                                      for _ in range(runs)])
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--import-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(request=not args.import_only))
+    else:
+        main(args.runs)
@@ -0,0 +1,111 @@
+# Рендер кожного шаблону з app/templates на реальних контекстах: сторінки обходяться через застосунок,
+# а контексти верхньорівневих рендерів записуються. Для кожного шаблону три варіанти:
+#   source   — нове середовище без кешу байткоду: компіляція шаблону й base.html + рендер (як раніше,
+#              коли кожен модуль мав власне Jinja2Templates, а воркер щойно стартував);
+#   bytecode — нове середовище з заповненим FileSystemBytecodeCache (перезапуск воркера після деплою);
+#   warm     — спільне середовище після warm_up (усталений стан).
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.template_render [--repeat 200]
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import use_temp_database, app_client, login, create_projects
+
+ANONYMOUS_PAGES = ["/auth/login", "/auth/register"]
+PAGES = ["/", "/projects/", "/projects/all", "/projects/new", "/projects/1",
+         "/projects/1/edit", "/donations/make/1", "/donations/my", "/donations/all", "/admin"]
+
+
+async def capture_contexts() -> dict:
+    """name -> контекст першого рендеру цього шаблону під час обходу сторінок."""
+    import jinja2
+    contexts = {}
+    render = jinja2.Template.render
+
+    def recording_render(self, *args, **kwargs):
+        contexts.setdefault(self.name, dict(*args, **kwargs))
+        return render(self, *args, **kwargs)
+
+    async with app_client() as client:
+        await login(client)
+        await create_projects(client, 12)
+        response = await client.post("/donations/make/1", data={"amount": "25", "message": "Тримайтесь"})
+        assert response.status_code in (200, 303), response.text
+        jinja2.Template.render = recording_render
+        try:
+            for page in PAGES:
+                response = await client.get(page)
+                assert response.status_code == 200, (page, response.status_code)
+            # Залогіненого користувача сторінки входу й реєстрації перенаправляють
+            async with client.__class__(transport=client._transport, base_url=client.base_url) as anonymous:
+                for page in ANONYMOUS_PAGES:
+                    response = await anonymous.get(page)
+                    assert response.status_code == 200, (page, response.status_code)
+        finally:
+            jinja2.Template.render = render
+    return contexts
+
+
+def new_templates(bytecode_cache=None):
+    import jinja2
+    from fastapi.templating import Jinja2Templates
+    from app import templating
+    return Jinja2Templates(env=jinja2.Environment(loader=jinja2.FileSystemLoader(templating.TEMPLATES_DIR),
+                                                  autoescape=True, auto_reload=False, bytecode_cache=bytecode_cache))
+
+
+def first_render(name: str, context: dict, bytecode_cache=None):
+    """Перший рендер у щойно створеному середовищі (як у щойно запущеному воркері)."""
+    new_templates(bytecode_cache).get_template(name).render(context)
+
+
+def median_ms(func, *args, repeat: int) -> float:
+    return statistics.median(_timed_once(func, *args) for _ in range(repeat)) * 1000
+
+
+def _timed_once(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(repeat: int):
+    import jinja2
+    from app import templating
+
+    contexts = asyncio.run(capture_contexts())
+    cache_dir = tempfile.mkdtemp(prefix="donations-bench-jinja-")
+    cache = jinja2.FileSystemBytecodeCache(cache_dir)
+    for name in contexts:  # Заповнюємо кеш байткоду, як це робить warm_up першого воркера
+        new_templates(cache).get_template(name).render(contexts[name])
+    templating.warm_up()
+
+    missing = set(templating.templates.env.list_templates(extensions=["html"])) - set(contexts)
+    print(f"{'template':<30} {'source':>9} {'bytecode':>9} {'warm':>9}")
+    totals = [0.0, 0.0, 0.0]
+    for name in sorted(contexts):
+        context = contexts[name]
+        warm_template = templating.templates.get_template(name)
+        row = [
+            median_ms(first_render, name, context, repeat=max(5, repeat // 10)),
+            median_ms(first_render, name, context, cache, repeat=max(5, repeat // 10)),
+            median_ms(warm_template.render, context, repeat=repeat),
+        ]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"{name:<30} " + " ".join(f"{value:>6.2f} ms" for value in row))
+    print(f"{'total':<30} " + " ".join(f"{value:>6.2f} ms" for value in totals))
+    if missing:
+        print(f"rendered only as includes/base: {', '.join(sorted(missing))}")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    use_temp_database(TEMPLATES_BYTECODE_CACHE="false")
+    main(args.repeat)
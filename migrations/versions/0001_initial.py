@@ -0,0 +1,60 @@
+"""Початкова схема (як її створював Base.metadata.create_all)
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_initial"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(255)),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(50)),
+        sa.Column("is_active", sa.Boolean()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_full_name", "users", ["full_name"])
+
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("target_amount", sa.Float(), nullable=False),
+        sa.Column("current_amount", sa.Float()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_projects_id", "projects", ["id"])
+    op.create_index("ix_projects_name", "projects", ["name"])
+
+    op.create_table(
+        "donations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("donation_date", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("message", sa.String(500), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+    )
+    op.create_index("ix_donations_id", "donations", ["id"])
+
+
+def downgrade():
+    op.drop_table("donations")
+    op.drop_table("projects")
+    op.drop_table("users")
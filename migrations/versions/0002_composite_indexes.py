@@ -0,0 +1,36 @@
+"""Складені індекси під запити списків проєктів і пожертв
+
+Revision ID: 0002_composite_indexes
+Revises: 0001_initial
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_composite_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_projects_active_created", "projects",
+                    ["is_active", sa.text("created_at DESC"), sa.text("id DESC")])
+    op.create_index("ix_projects_created", "projects",
+                    [sa.text("created_at DESC"), sa.text("id DESC")])
+    op.create_index("ix_donations_project_date", "donations",
+                    ["project_id", sa.text("donation_date DESC"), sa.text("id DESC")])
+    op.create_index("ix_donations_user_date", "donations",
+                    ["user_id", sa.text("donation_date DESC"), sa.text("id DESC")])
+    op.create_index("ix_donations_date", "donations",
+                    [sa.text("donation_date DESC"), sa.text("id DESC")])
+
+
+def downgrade():
+    op.drop_index("ix_donations_date", table_name="donations")
+    op.drop_index("ix_donations_user_date", table_name="donations")
+    op.drop_index("ix_donations_project_date", table_name="donations")
+    op.drop_index("ix_projects_created", table_name="projects")
+    op.drop_index("ix_projects_active_created", table_name="projects")
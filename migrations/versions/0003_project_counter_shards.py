@@ -0,0 +1,28 @@
+"""Таблиця шардів лічильника current_amount
+
+Revision ID: 0003_project_counter_shards
+Revises: 0002_composite_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_project_counter_shards"
+down_revision = "0002_composite_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_counter_shards",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("project_counter_shards")
@@ -0,0 +1,28 @@
+"""Поля updated_at / version у projects для ETag
+
+Revision ID: 0004_project_version
+Revises: 0003_project_counter_shards
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_project_version"
+down_revision = "0003_project_counter_shards"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # batch: SQLite не вміє ADD COLUMN з не-константним DEFAULT, тому таблиця перестворюється
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.drop_column("version")
+        batch_op.drop_column("updated_at")
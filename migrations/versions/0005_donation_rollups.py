@@ -0,0 +1,40 @@
+"""Таблиці денних агрегатів пожертв для дашборду
+
+Revision ID: 0005_donation_rollups
+Revises: 0004_project_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_donation_rollups"
+down_revision = "0004_project_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "donation_daily_rollups",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("donation_count", sa.Integer(), nullable=False),
+        sa.Column("unique_donors", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_donation_daily_rollups_day", "donation_daily_rollups", ["day"])
+    op.create_table(
+        "donation_daily_donors",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    )
+    # Агрегати для вже наявних пожертв заповнює 0008_backfill_donation_rollups
+
+
+def downgrade():
+    op.drop_table("donation_daily_donors")
+    op.drop_index("ix_donation_daily_rollups_day", table_name="donation_daily_rollups")
+    op.drop_table("donation_daily_rollups")
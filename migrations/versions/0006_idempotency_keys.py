@@ -0,0 +1,33 @@
+"""Ключі ідемпотентності для створення пожертв і проєктів
+
+Revision ID: 0006_idempotency_keys
+Revises: 0005_donation_rollups
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_idempotency_keys"
+down_revision = "0005_donation_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("key", sa.String(length=100), primary_key=True),
+        sa.Column("scope", sa.String(length=20), nullable=False),
+        sa.Column("resource_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    # Для фонового видалення прострочених ключів
+    op.create_index("ix_idempotency_keys_created", "idempotency_keys", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_idempotency_keys_created", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
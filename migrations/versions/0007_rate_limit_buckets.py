@@ -0,0 +1,28 @@
+"""Спільні відра обмеження частоти спроб входу
+
+Revision ID: 0007_rate_limit_buckets
+Revises: 0006_idempotency_keys
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_rate_limit_buckets"
+down_revision = "0006_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(length=300), primary_key=True),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,41 @@
+"""Заповнення денних агрегатів для пожертв, зроблених до 0005
+
+Revision ID: 0008_backfill_donation_rollups
+Revises: 0007_rate_limit_buckets
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0008_backfill_donation_rollups"
+down_revision = "0007_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Повний перерахунок тими самими INSERT ... SELECT ... GROUP BY, що й app.rollups.rebuild:
+    # без нього дашборд і /api/stats на наявній базі показували б лише пожертви після оновлення.
+    # День — дата в UTC (див. rollups.donation_day); інші БД зберігають donation_date уже в UTC
+    if op.get_bind().dialect.name == "postgresql":
+        day = "date(timezone('UTC', donation_date))"
+    else:
+        day = "date(donation_date)"
+    donations = "FROM donations WHERE project_id IN (SELECT id FROM projects)"
+    op.execute("DELETE FROM donation_daily_donors")
+    op.execute("DELETE FROM donation_daily_rollups")
+    op.execute(
+        "INSERT INTO donation_daily_rollups (project_id, day, total_amount, donation_count, unique_donors) "
+        f"SELECT project_id, {day}, sum(amount), count(id), count(DISTINCT user_id) {donations} "
+        f"GROUP BY project_id, {day}"
+    )
+    op.execute(
+        "INSERT INTO donation_daily_donors (project_id, day, user_id) "
+        f"SELECT DISTINCT project_id, {day}, user_id {donations} AND user_id IS NOT NULL"
+    )
+
+
+def downgrade():
+    # Лише дані: таблиці агрегатів видаляє downgrade 0005
+    pass
@@ -0,0 +1,31 @@
+"""Єдиний формат дат у SQLite для keyset-пагінації
+
+Revision ID: 0009_normalize_sqlite_timestamps
+Revises: 0008_backfill_donation_rollups
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0009_normalize_sqlite_timestamps"
+down_revision = "0008_backfill_donation_rollups"
+branch_labels = None
+depends_on = None
+
+# Колонки, за якими сортуються сторінки (app/pagination.py)
+SORT_COLUMNS = [("projects", "created_at"), ("donations", "donation_date")]
+
+
+def upgrade():
+    # server_default CURRENT_TIMESTAMP писав "YYYY-MM-DD HH:MM:SS", а SQLAlchemy — з ".ffffff".
+    # SQLite порівнює ці рядки посимвольно, тож один момент у двох форматах ламав межі сторінок
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, column in SORT_COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19")
+
+
+def downgrade():
+    # Обидва формати читаються однаково, повертати нічого не потрібно
+    pass
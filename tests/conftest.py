@@ -0,0 +1,100 @@
+# Тести працюють із тимчасовою SQLite-базою (схема — тими самими міграціями Alembic, що й на проді)
+# і без MongoDB: логи активності пишуться у FakeCollection. Запуск з кореня репозиторію: python -m pytest
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="donations-tests-")
+# Змінні середовища мають бути встановлені до імпорту app (налаштування читаються під час імпорту)
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ.pop("READ_REPLICA_DATABASE_URL", None)
+os.environ["ADMIN_EMAIL"] = "admin@example.com"
+os.environ["ADMIN_PASSWORD"] = "adminpassword"
+os.environ["ACTIVITY_LOG_SPOOL_PATH"] = os.path.join(TEST_DIR, "activity_log_spool.jsonl")
+os.environ["SLOW_QUERY_LOG_PATH"] = os.path.join(TEST_DIR, "slow_queries.jsonl")
+os.environ["ACTIVITY_LOG_FLUSH_INTERVAL"] = "0.05"
+os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+os.environ["TEMPLATES_BYTECODE_CACHE"] = "false"
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # StaticFiles(directory="app/static")
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+
+ADMIN_EMAIL = os.environ["ADMIN_EMAIL"]
+ADMIN_PASSWORD = os.environ["ADMIN_PASSWORD"]
+
+
+class FakeCollection:
+    """Замінник колекції Motor: insert_many з унікальним _id, як у MongoDB (помилка 11000 на дублікат)."""
+
+    def __init__(self):
+        self.docs = {}
+        self.insert_calls = 0
+        self.fail_with = None  # Виняток, який кидатиме кожен insert_many (імітація недоступної MongoDB)
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        errors = []
+        for index, doc in enumerate(docs):
+            doc.setdefault("_id", ObjectId())  # Як і драйвер, _id призначається до відправки
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    from app import main
+    from app.mongo_crud import activity_log_writer
+
+    async def skip_mongo_ping():
+        pass
+
+    main.check_mongo_connection = skip_mongo_ping
+    activity_log_writer.collection = FakeCollection()
+    with TestClient(main.app) as client:  # startup_event: міграції, адмін, фонові задачі
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    app_client.cookies.clear()
+    return app_client
+
+
+@pytest.fixture
+def admin_client(client):
+    response = client.post("/auth/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+                           follow_redirects=False)
+    assert response.status_code == 303, response.text
+    return client
+
+
+@pytest.fixture
+def run(app_client):
+    """Виконує корутину в event loop застосунку (там, де створені engine і фонові задачі)."""
+    def call(func, *args):
+        return app_client.portal.call(func, *args)
+    return call
+
+
+def create_project(run, name="Test project", target_amount=1000.0, is_active=True, description="Опис"):
+    from app import crud, schemas
+    from app.database import SessionLocal
+
+    async def create():
+        async with SessionLocal() as db:
+            return await crud.create_project(db, schemas.ProjectCreate(
+                name=name, description=description, target_amount=target_amount, is_active=is_active))
+    return run(create)
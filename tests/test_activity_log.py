@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from app.mongo_crud import ActivityLogSpool, ActivityLogWriter
+from tests.conftest import FakeCollection
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def writer(tmp_path, collection):
+    return ActivityLogWriter(collection=collection, batch_size=2, write_timeout=1.0,
+                             spool=ActivityLogSpool(str(tmp_path / "spool.jsonl")),
+                             breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+
+def _events(count: int, start: int = 0) -> list:
+    return [{"action": "TEST", "n": n} for n in range(start, start + count)]
+
+
+def _reset_timeout_elapsed(breaker: CircuitBreaker):
+    breaker._opened_at -= breaker.reset_timeout
+
+
+async def test_breaker_opens_after_failures_and_spools_without_calling_mongo(writer, collection):
+    collection.fail_with = ServerSelectionTimeoutError("down")
+    await writer._flush(_events(2))
+    assert writer.breaker.state == CLOSED
+    await writer._flush(_events(2, 2))
+    assert writer.breaker.state == OPEN
+    assert collection.insert_calls == 2
+
+    await writer._flush(_events(2, 4))  # Ланцюг розімкнений: MongoDB не викликається
+    assert collection.insert_calls == 2
+    assert writer.spooled == 6
+    assert writer.spool.has_data()
+
+
+async def test_half_open_success_closes_breaker_and_replays_spool(writer, collection):
+    collection.fail_with = ServerSelectionTimeoutError("down")
+    for start in range(0, 6, 2):
+        await writer._flush(_events(2, start))
+    assert writer.breaker.state == OPEN
+
+    collection.fail_with = None
+    _reset_timeout_elapsed(writer.breaker)
+    assert writer.breaker.state == HALF_OPEN
+    await writer._flush(_events(1, 6))
+
+    assert writer.breaker.state == CLOSED
+    assert sorted(doc["n"] for doc in collection.docs.values()) == list(range(7))
+    assert writer.replayed == 6
+    assert not writer.spool.has_data()
+
+
+async def test_half_open_failure_reopens_breaker(writer, collection):
+    writer.breaker.trip()
+    _reset_timeout_elapsed(writer.breaker)
+    collection.fail_with = ServerSelectionTimeoutError("still down")
+    await writer._flush(_events(1))
+    assert writer.breaker.state == OPEN
+    assert writer.breaker.opened_count == 2
+    assert collection.insert_calls == 1
+
+
+async def test_replay_streams_batches_and_ignores_duplicate_ids(writer, collection):
+    writer.breaker.trip()
+    await writer._flush(_events(5))
+    # Попереднє відтворення встигло записати частину подій, а потім обірвалось
+    with open(writer.spool.path, encoding="utf-8") as f:
+        first = ActivityLogSpool.read_batch(f, 2)
+    for doc in first:
+        collection.docs[doc["_id"]] = doc
+
+    await writer._replay_spool()
+
+    assert collection.insert_calls == 3  # 5 подій пачками по batch_size=2
+    assert len(collection.docs) == 5
+    assert not os.path.exists(writer.spool.replay_path)
+
+
+async def test_failed_replay_keeps_file_for_retry(writer, collection):
+    writer.breaker.trip()
+    await writer._flush(_events(3))
+    collection.fail_with = ServerSelectionTimeoutError("down again")
+    await writer._replay_spool()
+    assert os.path.exists(writer.spool.replay_path)
+    assert writer.replayed == 0
+
+    collection.fail_with = None
+    await writer._replay_spool()
+    assert len(collection.docs) == 3
+    assert writer.replayed == 3
+    assert not writer.spool.has_data()
+
+
+async def test_spool_size_is_capped(tmp_path, collection):
+    writer = ActivityLogWriter(collection=collection, spool=ActivityLogSpool(str(tmp_path / "spool.jsonl"),
+                                                                             max_bytes=300))
+    writer.breaker.trip()
+    await writer._flush(_events(20))
+    assert 0 < writer.spooled < 20
+    assert writer.spooled + writer.dropped == 20
+    assert os.path.getsize(writer.spool.path) <= 300
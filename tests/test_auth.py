@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.database import get_engine
+from tests.conftest import ADMIN_EMAIL, ADMIN_PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def single_worker_pool(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(auth, "_password_executor", executor)
+    monkeypatch.setattr(auth, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(auth, "PASSWORD_HASH_QUEUE_SIZE", 0)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+async def _wait_for_idle_pool():
+    for _ in range(200):
+        if auth._password_jobs_in_flight == 0:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_cancelled_wait_keeps_running_job_counted(single_worker_pool):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    waiter = asyncio.ensure_future(auth._run_password_job(slow_hash))
+    await asyncio.to_thread(started.wait, 5)
+    waiter.cancel()  # Клієнт від'єднався, а bcrypt у пулі ще працює
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert auth._password_jobs_in_flight == 1
+
+    with pytest.raises(HTTPException) as busy:
+        await auth._run_password_job(str)
+    assert busy.value.status_code == 503
+
+    release.set()
+    await _wait_for_idle_pool()
+    assert auth._password_jobs_in_flight == 0
+    assert await auth._run_password_job(str, 1) == "1"
+
+
+async def test_password_hash_round_trip_in_pool():
+    hashed = await auth.get_password_hash_async("secret")
+    assert await auth.verify_password_async("secret", hashed)
+    assert not await auth.verify_password_async("wrong", hashed)
+    await _wait_for_idle_pool()
+    assert auth._password_jobs_in_flight == 0
+
+
+def test_login_releases_connection_before_bcrypt(client, monkeypatch):
+    checked_out = []
+    verify_password = auth.verify_password
+
+    def verify(plain_password, hashed_password):
+        checked_out.append(get_engine().pool.checkedout())
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth, "verify_password", verify)
+    response = client.post("/auth/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+                           follow_redirects=False)
+    assert response.status_code == 303
+    assert client.post("/auth/token", data={"username": ADMIN_EMAIL, "password": "wrong"}).status_code == 401
+    assert checked_out == [0, 0]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+from tests.conftest import create_project
+
+DONATIONS = 200
+
+
+@pytest.fixture(params=[1, 8], ids=["single-row", "sharded"])
+def counter_shards(request, monkeypatch):
+    monkeypatch.setattr(crud, "DONATION_COUNTER_SHARDS", request.param)
+    return request.param
+
+
+def _donate_concurrently(run, project_id: int, user_id: int) -> list:
+    async def donate(amount: float):
+        async with SessionLocal() as db:
+            donation = await crud.create_donation(db, schemas.DonationCreate(project_id=project_id, amount=amount),
+                                                  user_id=user_id)
+            assert donation is not None
+
+    async def storm():
+        amounts = [float(n % 7 + 1) for n in range(DONATIONS)]
+        await asyncio.gather(*(donate(amount) for amount in amounts))
+        return amounts
+    return run(storm)
+
+
+def _admin_id(run) -> int:
+    async def read():
+        async with SessionLocal() as db:
+            return (await crud.get_user_by_email(db, "admin@example.com")).id
+    return run(read)
+
+
+def test_concurrent_donations_lose_no_updates(run, counter_shards):
+    project = create_project(run, name=f"Counter project ({counter_shards} shards)")
+    amounts = _donate_concurrently(run, project.id, _admin_id(run))
+
+    async def totals():
+        async with SessionLocal() as db:
+            current = (await crud.get_project(db, project.id)).current_amount
+            donated = await db.scalar(select(func.sum(models.Donation.amount))
+                                      .where(models.Donation.project_id == project.id))
+            return current, donated
+    current, donated = run(totals)
+    assert donated == sum(amounts)
+    assert current == sum(amounts)
+
+
+def test_project_update_does_not_write_back_folded_shards(run, monkeypatch):
+    monkeypatch.setattr(crud, "DONATION_COUNTER_SHARDS", 8)
+    project = create_project(run, name="Folded counter project")
+    amounts = _donate_concurrently(run, project.id, _admin_id(run))
+
+    async def rename_and_read():
+        async with SessionLocal() as db:
+            await crud.update_project(db, project.id, schemas.ProjectUpdate(name="Renamed counter project"))
+        async with SessionLocal() as db:
+            return (await crud.get_project(db, project.id)).current_amount
+    assert run(rename_and_read) == sum(amounts)
@@ -0,0 +1,44 @@
+from sqlalchemy import update
+
+from app import models
+from app.database import SessionLocal
+from tests.conftest import create_project
+
+
+def _update_amount_like_another_worker(run, project_id: int, amount: float):
+    # Пряма зміна в БД без fragment_cache.invalidate(): так виглядає запис з іншого воркера
+    async def write():
+        async with SessionLocal() as db:
+            await db.execute(update(models.Project).where(models.Project.id == project_id)
+                             .values(current_amount=amount, version=models.Project.version + 1))
+            await db.commit()
+    run(write)
+
+
+def test_projects_list_etag_never_pairs_with_stale_fragment(client, run):
+    project = create_project(run, name="ETag fragment project")
+    first = client.get("/projects/")
+    assert first.status_code == 200
+    assert "Зібрано: 0.00" in first.text
+
+    _update_amount_like_another_worker(run, project.id, 123.45)
+
+    second = client.get("/projects/")
+    assert second.headers["etag"] != first.headers["etag"]
+    assert "Зібрано: 123.45" in second.text
+    # Клієнт зі свіжим ETag отримує 304 лише тоді, коли тіло під цим ETag теж свіже
+    revalidated = client.get("/projects/", headers={"If-None-Match": second.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_project_detail_not_modified_until_project_changes(client, run):
+    project = create_project(run, name="ETag detail project")
+    first = client.get(f"/projects/{project.id}")
+    etag = first.headers["etag"]
+    assert client.get(f"/projects/{project.id}", headers={"If-None-Match": etag}).status_code == 304
+
+    _update_amount_like_another_worker(run, project.id, 10)
+
+    changed = client.get(f"/projects/{project.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, idempotency, models, schemas
+from app.database import SessionLocal
+from tests.conftest import ADMIN_EMAIL, create_project
+
+
+def _donations(run, project_id: int):
+    async def read():
+        async with SessionLocal() as db:
+            count = await db.scalar(select(func.count(models.Donation.id))
+                                    .where(models.Donation.project_id == project_id))
+            return count, (await crud.get_project(db, project_id)).current_amount
+    return run(read)
+
+
+def _projects_named(run, name: str) -> list:
+    async def read():
+        async with SessionLocal() as db:
+            return list(await db.scalars(select(models.Project.id).where(models.Project.name == name)))
+    return run(read)
+
+
+def _user_id(run, email: str) -> int:
+    async def read():
+        async with SessionLocal() as db:
+            return (await crud.get_user_by_email(db, email)).id
+    return run(read)
+
+
+@pytest.fixture
+def first_precheck_misses(monkeypatch):
+    """Перша перевірка ключа в обробнику "не бачить" запис — так, ніби паралельний запит зафіксував його
+    між перевіркою і commit. Далі виконання доходить до idempotency.record і DuplicateRequest."""
+    get_resource_id = idempotency.get_resource_id
+    calls = []
+
+    async def racing_get_resource_id(db, key):
+        calls.append(key)
+        if len(calls) == 1:
+            return None
+        return await get_resource_id(db, key)
+    monkeypatch.setattr(idempotency, "get_resource_id", racing_get_resource_id)
+    return calls
+
+
+def test_repeated_donation_submit_creates_one_donation(admin_client, run):
+    project = create_project(run, name="Idempotent donation project")
+    form = {"amount": "30", "idempotency_key": "donation-form-1"}
+    responses = [admin_client.post(f"/donations/make/{project.id}", data=form, follow_redirects=False)
+                 for _ in range(3)]
+    assert [response.status_code for response in responses] == [303] * 3
+    assert len({response.headers["location"] for response in responses}) == 1
+    assert _donations(run, project.id) == (1, 30.0)
+
+
+def test_repeated_project_submit_creates_one_project(admin_client, run):
+    form = {"name": "Idempotent project", "target_amount": "700", "is_active": "true",
+            "idempotency_key": "project-form-1"}
+    responses = [admin_client.post("/projects/new", data=form, follow_redirects=False) for _ in range(3)]
+    assert [response.status_code for response in responses] == [303] * 3
+    ids = _projects_named(run, "Idempotent project")
+    assert len(ids) == 1
+    assert {response.headers["location"] for response in responses} == {f"/projects/{ids[0]}"}
+
+
+def test_header_key_is_used_when_form_has_none(admin_client, run):
+    project = create_project(run, name="Header key project")
+    for _ in range(2):
+        response = admin_client.post(f"/donations/make/{project.id}", data={"amount": "5"},
+                                     headers={idempotency.IDEMPOTENCY_HEADER: "header-key-1"}, follow_redirects=False)
+        assert response.status_code == 303
+    assert _donations(run, project.id) == (1, 5.0)
+
+
+def test_concurrent_duplicate_donation_redirects(admin_client, run, first_precheck_misses):
+    project = create_project(run, name="Racing donation project")
+    form = {"amount": "12", "idempotency_key": "donation-race-1"}
+    assert admin_client.post(f"/donations/make/{project.id}", data=form, follow_redirects=False).status_code == 303
+    first_precheck_misses.clear()
+
+    response = admin_client.post(f"/donations/make/{project.id}", data=form, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == f"/projects/{project.id}?donation_success=true"
+    assert _donations(run, project.id) == (1, 12.0)  # Сума й агрегати дубліката відкочені
+
+
+def test_concurrent_duplicate_project_redirects_to_existing(admin_client, run, first_precheck_misses):
+    form = {"name": "Racing project", "target_amount": "900", "is_active": "true", "idempotency_key": "project-race-1"}
+    first = admin_client.post("/projects/new", data=form, follow_redirects=False)
+    assert first.status_code == 303
+    first_precheck_misses.clear()
+
+    response = admin_client.post("/projects/new", data=form, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == first.headers["location"]
+    assert len(_projects_named(run, "Racing project")) == 1
+
+
+def test_simultaneous_create_donation_with_one_key(run):
+    project = create_project(run, name="Simultaneous key project")
+    user_id = _user_id(run, ADMIN_EMAIL)
+    key = idempotency.IdempotencyKey(user_id=user_id, key="simultaneous-1", scope="donation")
+
+    async def donate():
+        async with SessionLocal() as db:
+            try:
+                await crud.create_donation(db, schemas.DonationCreate(project_id=project.id, amount=8),
+                                           user_id=user_id, idempotency_key=key)
+                return "created"
+            except idempotency.DuplicateRequest:
+                return "duplicate"
+
+    async def both():
+        return sorted(await asyncio.gather(donate(), donate()))
+    assert run(both) == ["created", "duplicate"]
+    assert _donations(run, project.id) == (1, 8.0)
+
+
+def test_same_key_for_different_users_does_not_collide(client, run):
+    project = create_project(run, name="Shared key project")
+
+    async def create_donor():
+        async with SessionLocal() as db:
+            await crud.create_user(db, schemas.UserCreate(email="second-donor@example.com", password="secret"))
+    run(create_donor)
+
+    for email, password in [(ADMIN_EMAIL, "adminpassword"), ("second-donor@example.com", "secret")]:
+        assert client.post("/auth/login", data={"username": email, "password": password},
+                           follow_redirects=False).status_code == 303
+        response = client.post(f"/donations/make/{project.id}", data={"amount": "10", "idempotency_key": "shared"},
+                               follow_redirects=False)
+        assert response.status_code == 303
+    assert _donations(run, project.id) == (2, 20.0)
+
+
+def test_key_reused_for_another_action_is_rejected(admin_client, run):
+    project = create_project(run, name="Scope key project")
+    assert admin_client.post(f"/donations/make/{project.id}", data={"amount": "3", "idempotency_key": "scoped"},
+                             follow_redirects=False).status_code == 303
+    response = admin_client.post("/projects/new", data={"name": "Scoped project", "target_amount": "100",
+                                                        "idempotency_key": "scoped"}, follow_redirects=False)
+    assert response.status_code == 422
+    assert _projects_named(run, "Scoped project") == []
@@ -0,0 +1,144 @@
+import json
+import re
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import crud, database, migrate, models, schemas
+from app.database import SessionLocal
+from app.pagination import keyset_page
+from app.routers import donations_router
+from tests.conftest import TEST_DIR, create_project
+
+TIED_DATE = datetime(2026, 3, 1)
+
+
+def _import_tied_donations(run, project_id: int, count: int, user_id=None) -> list:
+    rows = [(n, schemas.DonationImport(project_id=project_id, amount=n, user_id=user_id, donation_date=TIED_DATE,
+                                       message=f"Внесок {n}"))
+            for n in range(1, count + 1)]
+
+    async def import_rows():
+        async with SessionLocal() as db:
+            assert await crud.bulk_create_donations(db, rows) == []
+            result = await db.scalars(select(models.Donation.id).where(models.Donation.project_id == project_id)
+                                      .order_by(models.Donation.id.desc()))
+            return list(result)
+    return run(import_rows)
+
+
+def _walk(run, fetch):
+    """Проходить сторінки вперед до кінця, потім назад за prev-курсорами; повертає обидва списки сторінок."""
+    forward, cursor = [], None
+    while True:
+        page = run(fetch, cursor)
+        forward.append([item.id for item in page.items])
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    backward = [forward[-1]]
+    while page.prev_cursor:
+        page = run(fetch, page.prev_cursor)
+        backward.insert(0, [item.id for item in page.items])
+    return forward, backward
+
+
+def test_donations_with_tied_whole_second_dates_are_not_skipped(run):
+    project = create_project(run, name="Tied donations project")
+    ids = _import_tied_donations(run, project.id, 5)
+
+    async def fetch(cursor):
+        async with SessionLocal() as db:
+            return await crud.get_donations_for_project_page(db, project.id, cursor=cursor, limit=2)
+    forward, backward = _walk(run, fetch)
+    assert forward == [ids[0:2], ids[2:4], ids[4:5]]
+    assert backward == forward
+
+
+def test_projects_with_tied_created_at_are_not_skipped(run):
+    async def create_tied():
+        async with SessionLocal() as db:
+            db.add_all(models.Project(name=f"Tied project {n}", target_amount=100, created_at=TIED_DATE)
+                       for n in range(5))
+            await db.commit()
+    run(create_tied)
+
+    async def fetch(cursor):
+        async with SessionLocal() as db:
+            query = select(models.Project).where(models.Project.name.like("Tied project %"))
+            return await keyset_page(db, query, models.Project.created_at, models.Project.id, cursor=cursor, limit=2)
+    forward, backward = _walk(run, fetch)
+    assert [len(page) for page in forward] == [2, 2, 1]
+    assert len({project_id for page in forward for project_id in page}) == 5
+    assert backward == forward
+
+
+def test_defaults_and_migration_store_one_sqlite_format(run, monkeypatch):
+    project = create_project(run, name="Default timestamp project")
+    with sqlite3.connect(f"{TEST_DIR}/test.db") as conn:
+        created_at = conn.execute("SELECT created_at FROM projects WHERE id = ?", (project.id,)).fetchone()[0]
+    assert len(created_at) == 26  # Python-default, а не CURRENT_TIMESTAMP без мікросекунд
+
+    # Вже працююча база: рядки, записані server_default до оновлення
+    path = f"{TEST_DIR}/formats.db"
+    url = database.to_async_url(f"sqlite:///{path}")
+    monkeypatch.setattr(database, "ASYNC_DATABASE_URL", url)
+    monkeypatch.setattr(migrate, "ASYNC_DATABASE_URL", url)
+    migrate.upgrade_database("0008_backfill_donation_rollups", configure_logger=False)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO projects (id, name, target_amount, current_amount, is_active, created_at) "
+                     "VALUES (1, 'Old', 100, 0, 1, '2026-03-01 10:00:00')")
+        conn.executemany("INSERT INTO donations (amount, project_id, donation_date) VALUES (1, 1, ?)",
+                         [("2026-03-01 10:00:00",), ("2026-03-01 10:00:00.250000",)])
+    migrate.upgrade_database("head", configure_logger=False)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT created_at FROM projects").fetchall() == [("2026-03-01 10:00:00.000000",)]
+        assert conn.execute("SELECT donation_date FROM donations ORDER BY id").fetchall() == [
+            ("2026-03-01 10:00:00.000000",), ("2026-03-01 10:00:00.250000",)]
+
+
+def test_html_next_and_prev_links(client, run, monkeypatch):
+    monkeypatch.setattr(donations_router, "PAGE_SIZE", 2)
+
+    async def create_donor():
+        async with SessionLocal() as db:
+            return (await crud.create_user(db, schemas.UserCreate(email="pager@example.com", password="secret"))).id
+    user_id = run(create_donor)
+    project = create_project(run, name="Paged donations project")
+    _import_tied_donations(run, project.id, 5, user_id=user_id)
+    assert client.post("/auth/login", data={"username": "pager@example.com", "password": "secret"},
+                       follow_redirects=False).status_code == 303
+
+    def get_page(url):
+        html = client.get(url).text
+        found = {"prev" if "Попередня" in label else "next": href.replace("&amp;", "&") for href, label in
+                 re.findall(r'<a href="([^"]*cursor=[^"]*)" class="button">([^<]*)</a>', html)}
+        return re.findall(r"Внесок (\d)", html), found
+
+    pages, url = [], "/donations/my"
+    while url:
+        messages, found = get_page(url)
+        pages.append((messages, found))
+        url = found.get("next")
+    assert [(messages, set(found)) for messages, found in pages] == [
+        (["5", "4"], {"next"}), (["3", "2"], {"prev", "next"}), (["1"], {"prev"})]
+
+    assert get_page(pages[2][1]["prev"])[0] == ["3", "2"]
+    assert get_page(pages[1][1]["prev"])[0] == ["5", "4"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("date_from=2026-03-01T00:00:00", 5),
+    ("date_to=2026-03-01T00:00:00", 0),
+    ("date_from=2026-03-01T00:00:00&date_to=2026-03-02T00:00:00", 5),
+    ("date_from=2026-03-01T00:00:00.000001", 0),
+    ("date_from=2026-03-01T03:00:00%2B03:00&date_to=2026-03-01T03:00:00.000001%2B03:00", 5),
+])
+def test_export_date_bounds_include_whole_second_dates(admin_client, run, query, expected):
+    project = create_project(run, name=f"Export bounds project {query}")
+    _import_tied_donations(run, project.id, 5)
+    response = admin_client.get(f"/donations/export?format=ndjson&project_id={project.id}&{query}")
+    assert response.status_code == 200
+    assert len([json.loads(line) for line in response.text.splitlines() if line]) == expected
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import profiler
+from app.database import make_engine, to_async_url
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_slow_query_is_explained_on_the_engine_that_ran_it(tmp_path, monkeypatch):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(profiler, "SLOW_QUERY_LOG_PATH", str(log_path))
+    monkeypatch.setattr(profiler, "SLOW_QUERY_THRESHOLD_MS", 1e-6)
+    monkeypatch.setattr(profiler, "_recently_explained", profiler.TTLCache(100, 60))
+
+    # Дві бази з різними таблицями, як primary і репліка: план можна отримати лише у "своїй"
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = make_engine(to_async_url(f"sqlite:///{tmp_path}/{name}.db"))
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE TABLE only_on_{name} (id INTEGER PRIMARY KEY)"))
+        profiler.instrument_engine(engine)
+        engines[name] = engine
+    try:
+        for name, engine in engines.items():
+            async with engine.connect() as conn:
+                await conn.execute(text(f"SELECT id FROM only_on_{name} WHERE id = 1"))
+        await asyncio.gather(*profiler._background_tasks)
+    finally:
+        for engine in engines.values():
+            await engine.dispose()
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    explained = {entry["sql"]: entry for entry in entries if "plan" in entry or "plan_error" in entry}
+    assert set(explained) == {f"SELECT id FROM only_on_{name} WHERE id = 1" for name in engines}
+    for entry in explained.values():
+        assert "plan_error" not in entry, entry
+        assert any("only_on_" in step for step in entry["plan"])
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.progress_stream import ALL_PROJECTS, ProgressBroadcaster
+from tests.conftest import create_project
+
+
+@pytest.fixture
+def broadcaster():
+    broadcaster = ProgressBroadcaster(max_queue=4)
+    broadcaster.loads = []
+
+    async def load(project_ids):
+        broadcaster.loads.append(project_ids)
+        await asyncio.sleep(0.01)  # Запит до БД триває, поки підключаються інші глядачі
+        ids = [1, 2] if project_ids is None else project_ids
+        return broadcaster._merge({pid: (0.0, 100.0) for pid in ids}, project_ids)
+
+    broadcaster._load = load
+    return broadcaster
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("project_id", [1, ALL_PROJECTS])
+async def test_concurrent_subscribers_share_one_load(broadcaster, project_id):
+    subs = await asyncio.gather(*(broadcaster.subscribe(project_id) for _ in range(200)))
+    assert all(sub is not None for sub in subs)
+    assert len(broadcaster.loads) == 1
+    assert broadcaster.subscriber_count == 200
+
+
+@pytest.mark.anyio
+async def test_disconnected_first_subscriber_does_not_cancel_shared_load(broadcaster):
+    first = asyncio.ensure_future(broadcaster.subscribe(1))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(broadcaster.subscribe(1))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert (await second) is not None
+    assert len(broadcaster.loads) == 1
+
+
+@pytest.mark.anyio
+async def test_updates_are_coalesced_and_slow_subscribers_dropped(broadcaster):
+    reader = await broadcaster.subscribe(1)
+    slow = await broadcaster.subscribe(1)
+    assert await reader.get(0) is not None  # snapshot
+
+    for _ in range(10):
+        broadcaster.publish(1, 5.0)
+    broadcaster._flush()
+    event = await reader.get(0)
+    assert b'"current_amount":50.0' in event and b'"delta":50.0' in event
+
+    for _ in range(4):  # Черга slow (max_queue=4) вже містить snapshot і першу подію
+        broadcaster.publish(1, 1.0)
+        broadcaster._flush()
+        await reader.get(0)
+    assert slow.dropped
+    assert broadcaster.subscriber_count == 1
+
+
+def test_subscribe_loads_project_from_database(run):
+    project = create_project(run, name="Stream project", target_amount=500)
+
+    async def subscribe():
+        broadcaster = ProgressBroadcaster()
+        sub = await broadcaster.subscribe(project.id)
+        missing = await broadcaster.subscribe(10 ** 9)
+        return await sub.get(0), missing
+    event, missing = run(subscribe)
+    assert b'"target_amount":500.0' in event
+    assert missing is None
@@ -0,0 +1,54 @@
+import pytest
+
+from app import crud, fragment_cache, models, schemas
+from app.database import SessionLocal, get_engine
+from app.query_counter import assert_max_queries
+from tests.conftest import ADMIN_EMAIL, create_project
+
+DONORS = 5
+DONATIONS_PER_PROJECT = 15
+
+
+@pytest.fixture
+def donations(run):
+    """Дві сторінки проєктів з пожертвами від різних донорів: N+1 дав би десятки запитів на сторінку."""
+    projects = [create_project(run, name=f"Query count project {i}") for i in range(2)]
+
+    async def seed():
+        async with SessionLocal() as db:
+            users = [models.User(email=f"donor{i}-{projects[0].id}@example.com", hashed_password="x",
+                                 full_name=f"Donor {i}") for i in range(DONORS - 1)]
+            db.add_all(users)
+            await db.commit()
+            users.append(await crud.get_user_by_email(db, ADMIN_EMAIL))  # Для /donations/my
+            rows = [(n, schemas.DonationImport(project_id=project.id, amount=1 + n, user_id=users[n % DONORS].id))
+                    for project in projects for n in range(DONATIONS_PER_PROJECT)]
+            assert await crud.bulk_create_donations(db, rows) == []
+    run(seed)
+    return projects
+
+
+# Межі не залежать від кількості рядків на сторінці: donor / project завантажуються тим самим запитом
+PAGE_QUERY_LIMITS = [
+    ("/donations/all", 1),
+    ("/donations/my", 1),
+    ("/projects/{project_id}", 3),  # ETag-стан, проєкт, пожертви
+    ("/projects/all", 2),  # Сторінка проєктів + згортання шардів лічильника
+    ("/admin", 2),  # Лише денні агрегати
+]
+
+
+@pytest.mark.parametrize("url, limit", PAGE_QUERY_LIMITS)
+def test_page_renders_without_n_plus_one(admin_client, donations, url, limit):
+    url = url.format(project_id=donations[0].id)
+    admin_client.get(url)  # Прогрів кешу користувачів
+    with assert_max_queries(get_engine(), limit):
+        assert admin_client.get(url).status_code == 200
+
+
+def test_project_list_fragment_renders_with_constant_queries(client, donations):
+    fragment_cache.invalidate()
+    with assert_max_queries(get_engine(), 3):  # ETag-стан, сторінка проєктів, шарди лічильника
+        assert client.get("/projects/").status_code == 200
+    with assert_max_queries(get_engine(), 1):  # Фрагмент із кешу: лише ETag-стан
+        assert client.get("/projects/").status_code == 200
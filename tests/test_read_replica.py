@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from app import database, fragment_cache
+from tests.conftest import TEST_DIR, create_project
+
+REPLICA_PATH = f"{TEST_DIR}/replica.db"
+
+
+@pytest.fixture
+def replica(run, monkeypatch):
+    """Друга SQLite-база як відстала репліка: знімок primary, у якому проєкти перейменовано."""
+    with sqlite3.connect(f"{TEST_DIR}/test.db") as primary, sqlite3.connect(REPLICA_PATH) as copy:
+        primary.backup(copy)
+        copy.execute("UPDATE projects SET name = 'Replica: ' || name, version = version + 1000")
+    monkeypatch.setattr(database, "READ_REPLICA_DATABASE_URL", f"sqlite:///{REPLICA_PATH}")
+    monkeypatch.setattr(database, "_read_engine", None)
+    monkeypatch.setitem(database.ReadSessionLocal.kw, "bind", None)
+    fragment_cache.invalidate()
+    yield
+    if database._read_engine is not None:
+        run(database._read_engine.dispose)
+    fragment_cache.invalidate()
+
+
+@pytest.fixture
+def project(run):
+    return create_project(run, name="Routed project")
+
+
+def _page(client, url) -> str:
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.text
+
+
+def test_list_and_detail_pages_read_from_replica(client, project, replica):
+    assert "Replica: Routed project" in _page(client, f"/projects/{project.id}")
+    assert "Replica: Routed project" in _page(client, "/projects/")
+    assert database._read_engine is not None and database._read_engine is not database.get_engine()
+
+
+def test_write_redirect_reads_from_primary_until_cookie_expires(admin_client, project, replica):
+    response = admin_client.post(f"/projects/{project.id}/edit", data={
+        "name": "Edited on primary", "description": "Опис", "target_amount": 1000, "is_active": "true"},
+        follow_redirects=False)
+    assert response.status_code == 303
+    assert admin_client.cookies.get(database.READ_AFTER_WRITE_COOKIE) == "1"
+
+    # Репліка ще не має правки: видно її лише тому, що читання пішло на primary
+    assert "Edited on primary" in _page(admin_client, response.headers["location"])
+    assert "Edited on primary" in _page(admin_client, "/projects/")
+
+    admin_client.cookies.delete(database.READ_AFTER_WRITE_COOKIE)
+    page = _page(admin_client, f"/projects/{project.id}")
+    assert "Replica: Routed project" in page and "Edited on primary" not in page
+
+
+@pytest.mark.parametrize("form", ["donation", "project"])
+def test_create_and_donate_redirects_stick_to_primary(admin_client, project, replica, form):
+    if form == "donation":
+        response = admin_client.post(f"/donations/make/{project.id}", data={"amount": "25"}, follow_redirects=False)
+    else:
+        response = admin_client.post("/projects/new", data={
+            "name": "Created on primary", "description": "Опис", "target_amount": 500, "is_active": "true"},
+            follow_redirects=False)
+    assert response.status_code == 303
+    assert admin_client.cookies.get(database.READ_AFTER_WRITE_COOKIE) == "1"
+    # Нової пожертви чи проєкту на репліці немає, а сторінка після редіректу їх показує
+    page = _page(admin_client, response.headers["location"])
+    assert ("25.00" if form == "donation" else "Created on primary") in page
+    assert "Replica:" not in page
+
+
+def test_without_replica_no_cookie_is_set(admin_client, project):
+    response = admin_client.post(f"/donations/make/{project.id}", data={"amount": "5"}, follow_redirects=False)
+    assert response.status_code == 303
+    assert database.READ_AFTER_WRITE_COOKIE not in admin_client.cookies
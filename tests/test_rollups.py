@@ -0,0 +1,71 @@
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app import crud, database, migrate, rollups, schemas
+from app.database import SessionLocal
+from tests.conftest import TEST_DIR, create_project
+
+
+def _rollup_rows(run, project_id: int):
+    async def read():
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(rollups.rollups.c.day, rollups.rollups.c.total_amount, rollups.rollups.c.donation_count)
+                .where(rollups.rollups.c.project_id == project_id).order_by(rollups.rollups.c.day))
+            return [tuple(row) for row in result]
+    return run(read)
+
+
+def test_incremental_and_rebuilt_rollups_use_the_same_day(run):
+    project = create_project(run, name="Rollup day project")
+    kyiv = timezone(timedelta(hours=3))
+    rows = [
+        # 01:30 за Києвом 1 січня — це ще 31 грудня в UTC
+        (1, schemas.DonationImport(project_id=project.id, amount=10, donation_date=datetime(2026, 1, 1, 1, 30, tzinfo=kyiv))),
+        (2, schemas.DonationImport(project_id=project.id, amount=5, donation_date=datetime(2026, 1, 1, 12, 0))),
+    ]
+
+    async def import_rows():
+        async with SessionLocal() as db:
+            return await crud.bulk_create_donations(db, rows)
+    assert run(import_rows) == []
+
+    incremental = _rollup_rows(run, project.id)
+    assert incremental == [(date(2025, 12, 31), 10.0, 1), (date(2026, 1, 1), 5.0, 1)]
+
+    async def rebuild():
+        async with SessionLocal() as db:
+            await rollups.rebuild(db)
+    run(rebuild)
+    assert _rollup_rows(run, project.id) == incremental
+
+
+def test_migration_backfills_rollups_for_existing_donations(monkeypatch):
+    # Окрема база: схема до 0005, пожертви, потім оновлення до head — як на вже працюючому сервері
+    path = f"{TEST_DIR}/backfill.db"
+    url = database.to_async_url(f"sqlite:///{path}")
+    monkeypatch.setattr(database, "ASYNC_DATABASE_URL", url)
+    monkeypatch.setattr(migrate, "ASYNC_DATABASE_URL", url)
+    migrate.upgrade_database("0004_project_version", configure_logger=False)
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO users (id, email, hashed_password, role, is_active) "
+                     "VALUES (1, 'a@example.com', 'x', 'user', 1), (2, 'b@example.com', 'x', 'user', 1)")
+        conn.execute("INSERT INTO projects (id, name, target_amount, current_amount, is_active) "
+                     "VALUES (1, 'Old project', 100, 35, 1)")
+        conn.executemany("INSERT INTO donations (amount, project_id, user_id, donation_date) VALUES (?, 1, ?, ?)", [
+            (10, 1, "2026-03-01 08:00:00.000000"),
+            (20, 1, "2026-03-01 20:00:00.000000"),
+            (5, 2, "2026-03-02 09:00:00.000000"),
+        ])
+
+    migrate.upgrade_database("head", configure_logger=False)
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT day, total_amount, donation_count, unique_donors FROM donation_daily_rollups "
+                            "WHERE project_id = 1 ORDER BY day").fetchall()
+        donors = conn.execute("SELECT count(*) FROM donation_daily_donors").fetchone()[0]
+    assert rows == [("2026-03-01", 30.0, 2, 1), ("2026-03-02", 5.0, 1, 1)]
+    assert donors == 2
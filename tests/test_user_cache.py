@@ -0,0 +1,94 @@
+import time
+
+import pytest
+from sqlalchemy import event, update
+
+from app import auth, crud, models, schemas, user_cache
+from app.database import SessionLocal, get_engine
+
+
+def test_role_change_in_another_worker_is_visible_after_ttl(run, monkeypatch):
+    monkeypatch.setattr(user_cache.user_cache, "ttl", 0.2)
+
+    async def setup():
+        async with SessionLocal() as db:
+            user = await crud.create_user(db, schemas.UserCreate(email="stale@example.com", password="secret",
+                                                                 full_name="Stale Role"))
+            return user.id, auth.create_access_token({"sub": user.email})
+    user_id, token = run(setup)
+
+    async def current_role():
+        async with SessionLocal() as db:
+            return (await auth.get_user_by_token(token, db)).role
+
+    async def promote_directly():
+        # Так виглядає зміна з іншого воркера: БД оновлена, а локальний кеш про це не знає
+        async with SessionLocal() as db:
+            await db.execute(update(models.User).where(models.User.id == user_id).values(role="admin"))
+            await db.commit()
+
+    assert run(current_role) == "user"
+    run(promote_directly)
+    assert run(current_role) == "user"  # Застарілий знімок, але не довше за TTL
+    time.sleep(0.25)
+    assert run(current_role) == "admin"
+
+    async def demote():
+        async with SessionLocal() as db:
+            await crud.update_user(db, user_id, schemas.UserUpdate(email="stale@example.com", role="user"))
+    run(demote)
+    assert run(current_role) == "user"  # У своєму воркері update_user інвалідовує одразу
+
+
+@pytest.fixture
+def user_selects():
+    """SQL-запити до таблиці users, виконані під час тесту."""
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+    event.listen(get_engine().sync_engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(get_engine().sync_engine, "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def member_client(client, run):
+    async def create_member():
+        async with SessionLocal() as db:
+            if await crud.get_user_by_email(db, "cached@example.com") is None:
+                await crud.create_user(db, schemas.UserCreate(email="cached@example.com", password="secret"))
+    run(create_member)
+    assert client.post("/auth/login", data={"username": "cached@example.com", "password": "secret"},
+                       follow_redirects=False).status_code == 303
+    return client
+
+
+def test_repeated_authenticated_request_does_not_query_user(member_client, user_selects):
+    user_cache.invalidate_user("cached@example.com")
+    assert member_client.get("/donations/my").status_code == 200
+    assert len(user_selects) == 1
+    for _ in range(3):
+        assert member_client.get("/donations/my").status_code == 200
+    assert len(user_selects) == 1
+
+
+def test_invalidate_user_reloads_role_and_active_status(member_client, run, user_selects):
+    assert member_client.get("/admin").status_code == 403
+
+    async def set_user(**values):
+        async with SessionLocal() as db:
+            await db.execute(update(models.User).where(models.User.email == "cached@example.com").values(**values))
+            await db.commit()
+
+    run(lambda: set_user(role="admin"))
+    assert member_client.get("/admin").status_code == 403  # Знімок у кеші ще старий
+    user_cache.invalidate_user("cached@example.com")
+    assert member_client.get("/admin").status_code == 200
+
+    run(lambda: set_user(is_active=False))
+    user_cache.invalidate_user("cached@example.com")
+    selects_before = len(user_selects)
+    assert member_client.get("/admin").status_code == 400  # Inactive user
+    assert len(user_selects) == selects_before + 1
@@ -0,0 +1,31 @@
+import pytest
+
+from app import user_cache
+from app.database import get_engine
+from app.templating import templates
+from tests.conftest import create_project
+
+
+@pytest.fixture
+def checked_out_during_render(monkeypatch):
+    """Скільки з'єднань пулу зайнято в момент рендеру кожної сторінки."""
+    seen = []
+    original = templates.TemplateResponse
+
+    def template_response(*args, **kwargs):
+        seen.append(get_engine().pool.checkedout())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(templates, "TemplateResponse", template_response)
+    return seen
+
+
+@pytest.mark.parametrize("user_cached", [False, True])
+def test_pages_render_without_holding_connections(admin_client, run, checked_out_during_render, user_cached):
+    project = create_project(run, name="Render project")
+    if not user_cached:
+        # Промах кешу користувачів: знімок адміна береться з БД сесією залежності get_current_user_optional
+        user_cache.clear()
+    for url in ("/projects/", f"/projects/{project.id}", "/projects/all", "/donations/my"):
+        assert admin_client.get(url).status_code == 200, url
+    assert checked_out_during_render and set(checked_out_during_render) == {0}